@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from typing import List, Dict, Callable, Optional
+from fitness import FitnessCache
+from genetic_algorithm import GeneticAlgorithm
+from synthetic import generate_instance
+
+def time_call(function: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    Calls function repeat times and returns the best and mean wall time in seconds.
+    setup, if given, runs untimed before every call.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {"min_seconds": min(timings), "mean_seconds": sum(timings) / len(timings)}
+
+def code_version() -> Optional[str]:
+    """
+    Returns the short git commit hash of this checkout, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchmark_instance(
+    groups: int,
+    repeat: int = 5,
+    generations: int = 10,
+    population_size: int = 50,
+    seed: int = 0,
+    workers: int = 1,
+    **instance_options
+) -> List[Dict]:
+    """
+    Times the main GeneticAlgorithm operations on a synthetic instance with the given number of groups.
+    Subjects, lecturers and rooms scale with the group count unless given in instance_options.
+    The fitness cache is cleared before every timed calculate_fitness call, so it measures real scoring.
+    Returns one record per operation.
+    """
+    instance_options.setdefault('subjects', max(14, 3 * groups))
+    instance_options.setdefault('lecturers', max(20, 5 * groups))
+    instance_options.setdefault('rooms', max(5, groups + 1))
+    instance = generate_instance(groups=groups, seed=seed, **instance_options)
+    random.seed(seed)
+
+    def new_ga(**options) -> GeneticAlgorithm:
+        return GeneticAlgorithm(*instance, population_size=population_size, generations=generations, workers=workers, **options)
+
+    ga = new_ga()
+    ga.create_population()
+    population = ga.population
+
+    def clear_cache() -> None:
+        ga.fitness_cache = FitnessCache(ga.fitness_cache.max_size)
+
+    def clear_population() -> None:
+        ga.population = []
+        ga.fitness_scores = []
+        clear_cache()
+
+    operations = {
+        "generate_valid_schedule": (ga.generate_valid_schedule, None),
+        "create_population": (ga.create_population, clear_population),
+        "calculate_fitness": (ga.calculate_fitness, clear_cache),
+        "crossover_days": (lambda: ga.crossover_days(*random.sample(population, 2)), None),
+        "mutate": (lambda: ga.mutate(random.choice(population)), None),
+        "validate_schedule": (lambda: ga.validate_schedule(random.choice(population)), None),
+    }
+    timings = {name: time_call(function, repeat, setup) for name, (function, setup) in operations.items()}
+
+    runs: List[GeneticAlgorithm] = []
+
+    def prepare_run() -> None:
+        runs.append(new_ga())
+        runs[-1].create_population()
+
+    timings["run"] = time_call(lambda: runs[-1].run(), repeat, prepare_run)
+    ga.close()
+    for finished in runs:
+        finished.close()
+
+    size = {
+        "groups": groups,
+        "subjects": instance_options['subjects'],
+        "lecturers": instance_options['lecturers'],
+        "rooms": instance_options['rooms'],
+        "population_size": population_size,
+        "generations": generations,
+        "workers": workers,
+        "cpus": os.cpu_count(),
+    }
+    return [dict(operation=name, repeat=repeat, **size, **timing) for name, timing in timings.items()]
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """
+    Prints the ratio of the current best time to the baseline best time for every
+    (operation, size) found in both result files; ratios above 1 are slowdowns.
+    """
+    def load(path: str) -> Dict:
+        with open(path) as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        return {(record["operation"], record["groups"], record["workers"]): record for record in records}
+
+    baseline, current = load(baseline_path), load(current_path)
+    for key in sorted(baseline.keys() & current.keys()):
+        operation, groups, workers = key
+        ratio = current[key]["min_seconds"] / baseline[key]["min_seconds"]
+        print(f"{operation:<24} groups={groups:<4} workers={workers:<3} {ratio:6.2f}x")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Times the solver on synthetic instances of growing size.")
+    parser.add_argument("--sizes", default="4,8,16,32", help="comma-separated group counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--population-size", type=int, default=50)
+    parser.add_argument("--workers", default="1", help="comma-separated worker counts to compare")
+    parser.add_argument("--density", type=float, default=0.1, help="lecturer qualification density")
+    parser.add_argument("--tightness", type=float, default=0.5, help="room tightness between 0 and 1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.jsonl", help="JSON lines file the results are appended to")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    version = code_version()
+    with open(args.output, mode="a") as file:
+        for groups in (int(size) for size in args.sizes.split(",")):
+            for workers in (int(count) for count in args.workers.split(",")):
+                records = benchmark_instance(
+                    groups, repeat=args.repeat, generations=args.generations,
+                    population_size=args.population_size, seed=args.seed, workers=workers,
+                    qualification_density=args.density, room_tightness=args.tightness
+                )
+                for record in records:
+                    record.update(version=version, python=platform.python_version(), timestamp=time.time())
+                    file.write(json.dumps(record) + "\n")
+                    print(f"{record['operation']:<24} groups={groups:<4} workers={workers:<3} {record['min_seconds'] * 1000:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import pickle
+import random
+from models import Timetable, Group
+from typing import List, Dict, Tuple
+from encoding import EncodedTimetable
+from genetic_algorithm import GeneticAlgorithm, GenerationStats
+from utils import read_schedule_csv
+
+CHECKPOINT_FORMAT = 1
+
+def _instance_key(ga: GeneticAlgorithm) -> Tuple:
+    """
+    Identifies the instance layout the encodings refer to; a checkpoint only fits the same layout.
+    """
+    encoder = ga.encoder
+    return (
+        tuple(group.group_id for group in encoder.groups),
+        tuple(subject.name for subject in encoder.subjects),
+        tuple(lecturer.lecturer_id for lecturer in encoder.lecturers),
+        tuple(room.room_id for room in encoder.rooms),
+        tuple(encoder.time_slots),
+    )
+
+def save_checkpoint(ga: GeneticAlgorithm, path: str) -> None:
+    """
+    Saves the population as one int16 array of encoded timetables, together with the fitness scores,
+    the generation counter, the operator scheduler state and the state of the random module.
+    """
+    state = {
+        "format": CHECKPOINT_FORMAT,
+        "instance": _instance_key(ga),
+        "generation": ga.generation,
+        "cells": ga.encoder.encode_population(ga.population),
+        "fitness_scores": list(ga.fitness_scores),
+        "operator_scheduler": vars(ga.operator_scheduler),
+        "random_state": random.getstate(),
+    }
+    with open(path, mode="wb") as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_checkpoint(ga: GeneticAlgorithm, path: str) -> None:
+    """
+    Restores a checkpoint written by save_checkpoint into a GeneticAlgorithm built for the same instance,
+    so that run() continues from the saved generation with the saved random state. Resuming a checkpoint
+    is reproducible, but not bit-identical to the uninterrupted run: timetables are rebuilt in slot order,
+    which changes the order in which the mutation operators draw their lessons.
+    Raises ValueError if the checkpoint was made for a different instance.
+    """
+    with open(path, mode="rb") as file:
+        state = pickle.load(file)
+    if state.get("format") != CHECKPOINT_FORMAT:
+        raise ValueError(f"Unsupported checkpoint format {state.get('format')!r}")
+    if state["instance"] != _instance_key(ga):
+        raise ValueError("Checkpoint was saved for a different instance")
+    ga.population = [ga.encoder.decode(EncodedTimetable(cells)) for cells in state["cells"]]
+    ga.fitness_scores = list(state["fitness_scores"])
+    ga.generation = state["generation"]
+    vars(ga.operator_scheduler).update(state["operator_scheduler"])
+    random.setstate(state["random_state"])
+
+class Checkpointer:
+    """
+    run() callback that saves a checkpoint every interval generations.
+    """
+    def __init__(self, ga: GeneticAlgorithm, path: str, interval: int = 50):
+        self.ga = ga
+        self.path = path
+        self.interval = interval
+
+    def __call__(self, best: Timetable, stats: GenerationStats) -> None:
+        if stats.generation % self.interval == 0:
+            save_checkpoint(self.ga, self.path)
+
+def replan(ga: GeneticAlgorithm, filename: str) -> Tuple[Timetable, Dict[str, int]]:
+    """
+    Rebuilds a schedule exported by schedule_to_csv against the GeneticAlgorithm's current instance.
+    Lessons whose group, subject, slot, lecturer and room are all still valid are kept as they are.
+    A lesson whose lecturer is gone or no longer qualified, or whose room is gone or too small,
+    is placed again with another lecturer or room, in the same slot if possible; it is dropped only
+    if there is no free alternative. Lessons of removed groups or subjects are dropped.
+    Returns the timetable and counts of kept, replaced and dropped lessons.
+    """
+    groups = {group.group_id: group for group in ga.groups}
+    lecturers = {lecturer.name: lecturer for lecturer in ga.lecturers}
+    rooms = {room.room_id: room for room in ga.rooms}
+    slots = set(ga.time_slots)
+    timetable = Timetable()
+    affected: List[Tuple[Group, Tuple[int, int], tuple]] = []
+    report = {"kept": 0, "replaced": 0, "dropped": 0}
+
+    for group_id, slot, subject_name, lecturer_name, room_id, session_type in read_schedule_csv(filename):
+        group = groups.get(group_id)
+        subject = ga.subjects_dict.get(subject_name)
+        if group is None or subject is None or subject_name not in group.subjects or slot not in slots \
+                or session_type not in ga.index.session_types[subject_name] or (group_id, slot) in timetable.schedule:
+            report["dropped"] += 1
+            continue
+        qualified = ga.index.lecturers_for(subject_name, session_type)
+        feasible_rooms = ga.index.rooms_for(group)
+        lecturer = lecturers.get(lecturer_name)
+        room = rooms.get(room_id)
+        if lecturer in qualified and room in feasible_rooms and ga.is_assignment_valid(timetable, group_id, slot, lecturer, room):
+            timetable.schedule[(group_id, slot)] = (subject, lecturer, room, session_type)
+            report["kept"] += 1
+        elif qualified and feasible_rooms:
+            preferred_lecturer = lecturer if lecturer in qualified else qualified[0]
+            preferred_room = room if room in feasible_rooms else feasible_rooms[0]
+            affected.append((group, slot, (subject, preferred_lecturer, preferred_room, session_type)))
+        else:
+            report["dropped"] += 1
+
+    # Affected lessons go in after all valid ones, so they never displace a kept lesson.
+    for group, slot, assignment in affected:
+        placement = ga._find_placement(timetable, group, assignment, slot)
+        if placement is None:
+            report["dropped"] += 1
+            continue
+        new_slot, new_assignment = placement
+        timetable.schedule[(group.group_id, new_slot)] = new_assignment
+        report["replaced"] += 1
+    return timetable, report
+
+def warm_start(ga: GeneticAlgorithm, filename: str, perturbations: int = 1) -> Dict[str, int]:
+    """
+    Seeds the GeneticAlgorithm with the replanned schedule from filename (see replan) and variants of it,
+    and returns replan's report. A short run() with a patience limit is then enough to polish the result.
+    """
+    timetable, report = replan(ga, filename)
+    ga.seed_population([timetable], perturbations)
+    return report
@@ -0,0 +1,123 @@
+import heapq
+import random
+from models import Timetable, Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Optional, Set
+
+class ConstructiveBuilder:
+    """
+    Graph-colouring style constructor aimed at the required session counts (hours / 30 per session type).
+    Sessions are the vertices and time slots the colours. As in DSATUR, the session with the fewest
+    feasible slots left is placed first. A slot stays feasible for a session while its group and at least
+    one qualified lecturer are free there; rooms are checked when the session is placed.
+    Among the slots where a lecturer and room are free, the one adding the fewest windows to the group's
+    and lecturer's day is chosen, preferring slots next to lessons already placed, so days come out compact.
+    Ties are broken at random, so repeated builds give different timetables.
+    """
+    def __init__(self, ga):
+        self.ga = ga
+        self.day_periods: Dict[int, List[int]] = {}
+        for day, period in ga.time_slots:
+            self.day_periods.setdefault(day, []).append(period)
+
+    def sessions(self) -> List[Tuple[Group, Subject, str]]:
+        """
+        Returns one (group, subject, session type) entry per required session, skipping infeasible ones.
+        """
+        infeasible = set(self.ga.index.infeasible_sessions)
+        sessions = []
+        for group in self.ga.groups:
+            for subject_name in group.subjects:
+                subject = self.ga.subjects_dict[subject_name]
+                for session_type in self.ga.index.session_types[subject_name]:
+                    if (group.group_id, subject_name, session_type) in infeasible:
+                        continue
+                    hours = subject.lecture_hours if session_type == 'Lecture' else subject.practice_hours
+                    sessions.extend([(group, subject, session_type)] * int(hours / 30))
+        return sessions
+
+    def build(self) -> Timetable:
+        timetable = Timetable()
+        sessions = self.sessions()
+        qualified = [self.ga.index.lecturers_for(subject.name, session_type) for _, subject, session_type in sessions]
+        feasible: List[Set[Tuple[int, int]]] = [set(self.ga.time_slots) for _ in sessions]
+
+        by_group: Dict[str, List[int]] = {}
+        by_lecturer: Dict[str, List[int]] = {}
+        for i, (group, _, _) in enumerate(sessions):
+            by_group.setdefault(group.group_id, []).append(i)
+            for lecturer in qualified[i]:
+                by_lecturer.setdefault(lecturer.name, []).append(i)
+
+        # Heap entries are (feasible slot count, fewer options first, random tie-break, session).
+        # Counts only shrink, so an entry whose count no longer matches is stale and skipped.
+        heap = [(len(feasible[i]), len(qualified[i]), random.random(), i) for i in range(len(sessions))]
+        heapq.heapify(heap)
+        placed = [False] * len(sessions)
+        lecturer_load: Dict[str, int] = {}
+
+        while heap:
+            count, _, _, i = heapq.heappop(heap)
+            if placed[i] or count != len(feasible[i]):
+                continue
+            placed[i] = True
+            group, subject, session_type = sessions[i]
+            placement = self._best_placement(timetable, group, qualified[i], feasible[i], lecturer_load)
+            if placement is None:
+                continue
+            slot, lecturer, room = placement
+            timetable.schedule[(group.group_id, slot)] = (subject, lecturer, room, session_type)
+            lecturer_load[lecturer.name] = lecturer_load.get(lecturer.name, 0) + 1
+
+            affected = set(by_group[group.group_id])
+            affected.update(by_lecturer.get(lecturer.name, []))
+            for j in affected:
+                if placed[j] or slot not in feasible[j]:
+                    continue
+                other_group = sessions[j][0]
+                if (other_group.group_id, slot) in timetable.schedule or all(
+                    (other.name, slot) in timetable.lecturer_slots for other in qualified[j]
+                ):
+                    feasible[j].discard(slot)
+                    heapq.heappush(heap, (len(feasible[j]), len(qualified[j]), random.random(), j))
+        return timetable
+
+    def _best_placement(
+        self,
+        timetable: Timetable,
+        group: Group,
+        lecturers: List[Lecturer],
+        slots: Set[Tuple[int, int]],
+        lecturer_load: Dict[str, int]
+    ) -> Optional[Tuple[Tuple[int, int], Lecturer, Room]]:
+        best = None
+        best_key = None
+        for slot in slots:
+            free_lecturers = [lecturer for lecturer in lecturers if (lecturer.name, slot) not in timetable.lecturer_slots]
+            room = next(
+                (room for room in self.ga.index.rooms_for(group) if (room.room_id, slot) not in timetable.room_slots),
+                None
+            )
+            if not free_lecturers or room is None:
+                continue
+            lecturer = min(free_lecturers, key=lambda lecturer: (lecturer_load.get(lecturer.name, 0), random.random()))
+            group_added, group_adjacent = self._day_cost(timetable.schedule, group.group_id, slot)
+            lecturer_added, lecturer_adjacent = self._day_cost(timetable.lecturer_slots, lecturer.name, slot)
+            key = (10 * group_added + lecturer_added, -(group_adjacent + lecturer_adjacent), random.random())
+            if best_key is None or key < best_key:
+                best_key = key
+                best = (slot, lecturer, room)
+        return best
+
+    def _day_cost(self, occupancy, entity: str, slot: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Returns how many windows placing a lesson at slot adds to the entity's day,
+        and how many of the neighbouring periods are already taken.
+        """
+        day, period = slot
+        mask = 0
+        for p in self.day_periods[day]:
+            if (entity, (day, p)) in occupancy:
+                mask |= 1 << p
+        table = self.ga.grid.window_table
+        adjacent = sum((entity, (day, period + step)) in occupancy for step in (-1, 1))
+        return table[mask | (1 << period)] - table[mask], adjacent
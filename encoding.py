@@ -0,0 +1,185 @@
+import numpy as np
+from models import Timetable, Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Sequence, Iterable, Optional
+from timegrid import TimeGrid
+
+SESSION_TYPES: List[str] = ['Lecture', 'Practice']
+
+# Channels of the last axis of an encoded cell; EMPTY marks a free (group, slot) cell.
+SUBJECT, LECTURER, ROOM, SESSION_TYPE = range(4)
+CHANNELS = 4
+EMPTY = -1
+
+class EncodedTimetable:
+    """
+    Dense integer form of a Timetable.
+    cells[g, t] holds (subject, lecturer, room, session type) ids for group g at time slot t,
+    or EMPTY in every channel when the group is free.
+    """
+    def __init__(self, cells: np.ndarray):
+        self.cells: np.ndarray = cells
+
+    def copy(self) -> "EncodedTimetable":
+        return EncodedTimetable(self.cells.copy())
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.nbytes
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.cells[..., SUBJECT] != EMPTY))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EncodedTimetable) and np.array_equal(self.cells, other.cells)
+
+    def __repr__(self) -> str:
+        return f"EncodedTimetable(shape={self.cells.shape}, lessons={len(self)})"
+
+class TimetableEncoder:
+    """
+    Assigns integer ids to groups, subjects, lecturers, rooms, session types and time slots
+    and converts timetables to and from their EncodedTimetable form.
+    Ids follow the order of the lists passed in and slot ids the order of the grid's slots
+    (the default 5 x 4 grid unless given), so two encoders built from the same instance data
+    produce identical encodings.
+    The operators, repair and local search work on Timetable objects, while the encoded form is what
+    is scored in batches, written to checkpoints and sent to other processes. With pack_population,
+    the GA also keeps the individuals that survive a generation packed into their encoding
+    (Timetable.pack), and they are decoded again only when an operator reads them.
+    """
+    def __init__(
+        self,
+        groups: List[Group],
+        subjects: List[Subject],
+        lecturers: List[Lecturer],
+        rooms: List[Room],
+        grid: Optional[TimeGrid] = None
+    ):
+        self.groups = list(groups)
+        self.subjects = list(subjects)
+        self.lecturers = list(lecturers)
+        self.rooms = list(rooms)
+        self.session_types = list(SESSION_TYPES)
+        self.grid = grid if grid is not None else TimeGrid()
+        self.time_slots: List[Tuple[int, int]] = list(self.grid.slots)
+
+        self.group_index: Dict[str, int] = {group.group_id: i for i, group in enumerate(self.groups)}
+        self.subject_index: Dict[str, int] = {subject.name: i for i, subject in enumerate(self.subjects)}
+        self.lecturer_index: Dict[str, int] = {lecturer.lecturer_id: i for i, lecturer in enumerate(self.lecturers)}
+        self.room_index: Dict[str, int] = {room.room_id: i for i, room in enumerate(self.rooms)}
+        self.session_type_index: Dict[str, int] = {session_type: i for i, session_type in enumerate(self.session_types)}
+        self.slot_index: Dict[Tuple[int, int], int] = {slot: i for i, slot in enumerate(self.time_slots)}
+        self.slot_days = np.array([day for day, _ in self.time_slots], dtype=np.int64)
+        # cell_keys[g * slots + t]: the schedule key of cell (g, t), shared by every decoded timetable.
+        self.cell_keys: List[Tuple[str, Tuple[int, int]]] = [
+            (group.group_id, slot) for group in self.groups for slot in self.time_slots
+        ]
+
+        largest = max(len(self.subjects), len(self.lecturers), len(self.rooms), len(self.session_types))
+        self.dtype = np.int16 if largest < np.iinfo(np.int16).max else np.int32
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (len(self.groups), len(self.time_slots), CHANNELS)
+
+    def empty(self) -> EncodedTimetable:
+        return EncodedTimetable(np.full(self.shape, EMPTY, dtype=self.dtype))
+
+    def encode(self, timetable: Timetable) -> EncodedTimetable:
+        encoded = self.empty()
+        self.encode_into(timetable, encoded.cells)
+        return encoded
+
+    def encode_into(self, timetable: Timetable, cells: np.ndarray) -> None:
+        """
+        Writes the encoding of a timetable into a preallocated (groups, slots, channels) array.
+        The encoding a packed timetable keeps is copied without decoding the timetable.
+        """
+        kept = timetable.encoding(self)
+        if kept is not None:
+            cells[...] = kept.cells
+            return
+        cells.fill(EMPTY)
+        rows = [
+            (
+                self.group_index[group_id],
+                self.slot_index[slot],
+                self.subject_index[subject.name],
+                self.lecturer_index[lecturer.lecturer_id],
+                self.room_index[room.room_id],
+                self.session_type_index[session_type],
+            )
+            for (group_id, slot), (subject, lecturer, room, session_type) in timetable.schedule.items()
+        ]
+        if rows:
+            index = np.array(rows, dtype=np.int64)
+            cells[index[:, 0], index[:, 1]] = index[:, 2:]
+
+    def encode_population(self, timetables: Sequence[Timetable]) -> np.ndarray:
+        """
+        Stacks the encodings of several timetables into one (population, groups, slots, channels) array.
+        """
+        cells = np.empty((len(timetables),) + self.shape, dtype=self.dtype)
+        for i, timetable in enumerate(timetables):
+            self.encode_into(timetable, cells[i])
+        return cells
+
+    def apply_changes(self, encoded: EncodedTimetable, changes: Iterable[Tuple]) -> EncodedTimetable:
+        """
+        Returns a copy of the encoding with the changed cells, given as fitness.Change tuples, rewritten.
+        """
+        changed = encoded.copy()
+        for (group_id, slot), _, new in changes:
+            cell = changed.cells[self.group_index[group_id], self.slot_index[slot]]
+            if new is None:
+                cell[:] = EMPTY
+            else:
+                subject, lecturer, room, session_type = new
+                cell[:] = (
+                    self.subject_index[subject.name],
+                    self.lecturer_index[lecturer.lecturer_id],
+                    self.room_index[room.room_id],
+                    self.session_type_index[session_type],
+                )
+        return changed
+
+    def days(self, encoded: EncodedTimetable) -> List[int]:
+        """
+        Returns the days on which the encoded timetable has lessons.
+        """
+        return list(set(self.slot_days[(encoded.cells[..., SUBJECT] != EMPTY).any(axis=0)].tolist()))
+
+    def combine_days(
+        self,
+        first: EncodedTimetable,
+        second: EncodedTimetable,
+        first_days: Sequence[int],
+        second_days: Sequence[int]
+    ) -> EncodedTimetable:
+        """
+        Returns the encoding holding the lessons of first on first_days and those of second on second_days.
+        """
+        combined = self.empty()
+        for encoded, days in ((first, first_days), (second, second_days)):
+            slots = np.isin(self.slot_days, list(days))
+            combined.cells[:, slots] = encoded.cells[:, slots]
+        return combined
+
+    def decode(self, encoded: EncodedTimetable) -> Timetable:
+        timetable = Timetable()
+        timetable.schedule = self.lessons(encoded)
+        return timetable
+
+    def lessons(self, encoded: EncodedTimetable) -> Dict[Tuple[str, Tuple[int, int]], Tuple[Subject, Lecturer, Room, str]]:
+        """
+        Returns the schedule dict of an encoded timetable, in group and slot order.
+        """
+        cells = encoded.cells.reshape(-1, CHANNELS)
+        occupied = np.flatnonzero(cells[:, SUBJECT] != EMPTY)
+        keys, subjects, lecturers, rooms, session_types = (
+            self.cell_keys, self.subjects, self.lecturers, self.rooms, self.session_types
+        )
+        return {
+            keys[cell]: (subjects[subject_id], lecturers[lecturer_id], rooms[room_id], session_types[session_type_id])
+            for cell, (subject_id, lecturer_id, room_id, session_type_id) in zip(occupied.tolist(), cells[occupied].tolist())
+        }
@@ -0,0 +1,353 @@
+import numpy as np
+from collections import OrderedDict
+from models import Timetable, Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Iterable, Sequence, Optional
+from encoding import TimetableEncoder, SUBJECT, LECTURER, SESSION_TYPE, EMPTY
+from timegrid import window_table
+
+Assignment = Tuple[Subject, Lecturer, Room, str]
+
+class BatchFitnessEvaluator:
+    """
+    Scores a whole population at once on its encoded form.
+    Produces exactly the values of GeneticAlgorithm.calculate_individual_fitness:
+    1000 minus the squared session-count penalties, the fourth-power group window
+    penalties and the squared lecturer window penalties.
+    Individuals are scored chunk_size at a time, so the working arrays stay the same size however
+    large the population is. Session counts are only kept for the (group, subject) pairs the groups
+    list, and occupancy is packed into per-day period bitmasks.
+    """
+    def __init__(self, encoder: TimetableEncoder, chunk_size: int = 256):
+        self.encoder = encoder
+        self.chunk_size = chunk_size
+        n_groups = len(encoder.groups)
+        n_subjects = len(encoder.subjects)
+        n_types = len(encoder.session_types)
+
+        required = np.zeros((n_subjects, n_types), dtype=np.int64)
+        for s, subject in enumerate(encoder.subjects):
+            required[s, encoder.session_type_index['Lecture']] = int(subject.lecture_hours / 30)
+            required[s, encoder.session_type_index['Practice']] = int(subject.practice_hours / 30)
+
+        # pair_index[g, s]: id of the (group g, subject s) pair if g lists s, otherwise -1.
+        # Lessons of unlisted subjects add nothing to the session penalty, so only listed pairs are counted.
+        self.pair_index = np.full((n_groups, n_subjects), -1, dtype=np.int32)
+        pair_subjects: List[int] = []
+        multiplicity: List[int] = []
+        for g, group in enumerate(encoder.groups):
+            for subject_name in group.subjects:
+                s = encoder.subject_index[subject_name]
+                if self.pair_index[g, s] < 0:
+                    self.pair_index[g, s] = len(pair_subjects)
+                    pair_subjects.append(s)
+                    multiplicity.append(0)
+                multiplicity[self.pair_index[g, s]] += 1
+        # pair_required[pair, type]: sessions of each type the pair should get; pair_multiplicity[pair]:
+        # how many times the group lists the subject.
+        self.pair_required = required[pair_subjects].reshape(len(pair_subjects), n_types)
+        self.pair_multiplicity = np.array(multiplicity, dtype=np.int64)
+
+        # Lecturers are told apart by name, as in calculate_individual_fitness.
+        names = {}
+        self.lecturer_class = np.array(
+            [names.setdefault(lecturer.name, len(names)) for lecturer in encoder.lecturers],
+            dtype=np.int32
+        )
+        self.n_lecturer_classes = len(names)
+
+        self.slot_day = np.array([day for day, _ in encoder.time_slots], dtype=np.int64)
+        self.slot_period = np.array([period for _, period in encoder.time_slots], dtype=np.int64)
+        self.n_days = int(self.slot_day.max()) + 1 if len(encoder.time_slots) else 0
+        self.n_periods = int(self.slot_period.max()) + 1 if len(encoder.time_slots) else 0
+        self.window_table = np.array(window_table(self.n_periods), dtype=np.int64)
+
+    def evaluate(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Takes a (population, groups, slots, channels) array and returns one fitness per individual.
+        """
+        return np.concatenate(
+            [self._evaluate_chunk(cells[start:start + self.chunk_size]) for start in range(0, cells.shape[0], self.chunk_size)]
+        ) if cells.shape[0] else np.zeros(0, dtype=np.int64)
+
+    def evaluate_timetables(self, timetables: Sequence[Timetable]) -> List[int]:
+        scores: List[int] = []
+        for start in range(0, len(timetables), self.chunk_size):
+            cells = self.encoder.encode_population(timetables[start:start + self.chunk_size])
+            scores.extend(int(score) for score in self._evaluate_chunk(cells))
+        return scores
+
+    def _evaluate_chunk(self, cells: np.ndarray) -> np.ndarray:
+        population = cells.shape[0]
+        n_slots = cells.shape[2]
+        n_pairs, n_types = self.pair_required.shape
+        occupied = cells[..., SUBJECT] != EMPTY
+        p_idx, g_idx, t_idx = np.nonzero(occupied)
+        lessons = cells[p_idx, g_idx, t_idx]
+
+        pair_ids = self.pair_index[g_idx, lessons[:, SUBJECT]]
+        listed = pair_ids >= 0
+        counts = np.bincount(
+            (p_idx[listed] * n_pairs + pair_ids[listed]) * n_types + lessons[listed, SESSION_TYPE],
+            minlength=population * n_pairs * n_types
+        ).reshape(population, n_pairs, n_types)
+        counts -= self.pair_required
+        np.abs(counts, out=counts)
+        counts *= 10
+        counts **= 2
+        session_penalty = (counts.sum(axis=2) * self.pair_multiplicity).sum(axis=1)
+
+        group_windows = self._windows(occupied)
+        group_penalty = (10 * group_windows ** 4).sum(axis=1)
+
+        lecturer_occupied = np.zeros((population, self.n_lecturer_classes, n_slots), dtype=bool)
+        lecturer_occupied[p_idx, self.lecturer_class[lessons[:, LECTURER]], t_idx] = True
+        lecturer_windows = self._windows(lecturer_occupied)
+        lecturer_penalty = (2 * lecturer_windows ** 2).sum(axis=1)
+
+        return 1000 - (session_penalty + group_penalty + lecturer_penalty)
+
+    def _windows(self, occupied: np.ndarray) -> np.ndarray:
+        """
+        Takes an (..., slots) occupancy mask and returns the number of free periods between
+        the first and last lesson of each day, summed over days, as int64 with shape (...).
+        Each day's occupancy is packed into a period bitmask and looked up in the window table.
+        """
+        masks = np.zeros(occupied.shape[:-1] + (self.n_days,), dtype=np.int32)
+        for t, (day, period) in enumerate(zip(self.slot_day, self.slot_period)):
+            masks[..., day] |= occupied[..., t].astype(np.int32) << period
+        return self.window_table[masks].sum(axis=-1)
+
+class FitnessCache:
+    """
+    Bounded LRU map from Timetable.fingerprint() to fitness.
+    """
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: int) -> Optional[int]:
+        fitness = self._entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return fitness
+
+    def put(self, key: int, fitness: int) -> None:
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"FitnessCache(size={len(self)}, hits={self.hits}, misses={self.misses})"
+
+class BreakdownCache(FitnessCache):
+    """
+    Bounded LRU map from Timetable.fingerprint() to the timetable's ScoreBreakdown, or to the
+    (parent breakdown, changes) pair it is derived from until a lookup needs it.
+    """
+
+class ScoreBreakdown:
+    """
+    Per-component scoring state of one timetable, kept so that a small change can be rescored
+    without walking the whole schedule.
+    """
+    def __init__(self):
+        self.session_counts: Dict[Tuple[str, str, str], int] = {}
+        self.group_slots: Dict[Tuple[str, Tuple[int, int]], int] = {}
+        self.lecturer_slots: Dict[Tuple[str, Tuple[int, int]], int] = {}
+        self.group_day_windows: Dict[Tuple[str, int], int] = {}
+        self.lecturer_day_windows: Dict[Tuple[str, int], int] = {}
+        self.group_windows: Dict[str, int] = {}
+        self.lecturer_windows: Dict[str, int] = {}
+        self.session_penalty: int = 0
+        self.group_penalty: int = 0
+        self.lecturer_penalty: int = 0
+
+    @property
+    def fitness(self) -> int:
+        return 1000 - (self.session_penalty + self.group_penalty + self.lecturer_penalty)
+
+    def copy(self) -> "ScoreBreakdown":
+        b = ScoreBreakdown()
+        for name, value in vars(self).items():
+            setattr(b, name, dict(value) if isinstance(value, dict) else value)
+        return b
+
+    def __repr__(self) -> str:
+        return (
+            f"ScoreBreakdown(fitness={self.fitness}, session_penalty={self.session_penalty}, "
+            f"group_penalty={self.group_penalty}, lecturer_penalty={self.lecturer_penalty})"
+        )
+
+# A changed cell: (group_id, slot) key, assignment before the change, assignment after it.
+# None stands for an empty cell, so a pop is (key, old, None) and an insert is (key, None, new).
+Change = Tuple[Tuple[str, Tuple[int, int]], Optional[Assignment], Optional[Assignment]]
+
+class DeltaEvaluator:
+    """
+    Rescores a timetable from its parent's ScoreBreakdown and the list of changed cells.
+    Only the session-count terms, group/day and lecturer/day window counts touched by the
+    change are recomputed, so the cost follows the size of the change.
+    """
+    def __init__(self, groups: List[Group], subjects: List[Subject], time_slots: Iterable[Tuple[int, int]]):
+        subjects_dict = {subject.name: subject for subject in subjects}
+        self.groups = groups
+        self.required: Dict[Tuple[str, str], int] = {}
+        for subject in subjects:
+            self.required[(subject.name, 'Lecture')] = int(subject.lecture_hours / 30)
+            self.required[(subject.name, 'Practice')] = int(subject.practice_hours / 30)
+        self.multiplicity: Dict[Tuple[str, str], int] = {}
+        for group in groups:
+            for subject_name in group.subjects:
+                if subject_name in subjects_dict:
+                    key = (group.group_id, subject_name)
+                    self.multiplicity[key] = self.multiplicity.get(key, 0) + 1
+        self.day_periods: Dict[int, List[int]] = {}
+        for day, period in sorted(time_slots):
+            self.day_periods.setdefault(day, []).append(period)
+        periods = [period for day_periods in self.day_periods.values() for period in day_periods]
+        self.window_table = window_table(max(periods) + 1 if periods else 0)
+
+    def breakdown(self, timetable: Timetable) -> ScoreBreakdown:
+        b = ScoreBreakdown()
+        for (group_id, slot), (subject, lecturer, _, session_type) in timetable.schedule.items():
+            key = (group_id, subject.name, session_type)
+            b.session_counts[key] = b.session_counts.get(key, 0) + 1
+            b.group_slots[(group_id, slot)] = b.group_slots.get((group_id, slot), 0) + 1
+            b.lecturer_slots[(lecturer.name, slot)] = b.lecturer_slots.get((lecturer.name, slot), 0) + 1
+
+        for (group_id, subject_name), multiplicity in self.multiplicity.items():
+            for session_type in ['Lecture', 'Practice']:
+                count = b.session_counts.get((group_id, subject_name, session_type), 0)
+                b.session_penalty += self._session_term(group_id, subject_name, session_type, count)
+
+        group_days = set((group_id, slot[0]) for group_id, slot in b.group_slots)
+        for group_id, day in group_days:
+            windows = self._day_windows(b.group_slots, {}, group_id, day)
+            b.group_day_windows[(group_id, day)] = windows
+            b.group_windows[group_id] = b.group_windows.get(group_id, 0) + windows
+        b.group_penalty = sum(10 * windows**4 for windows in b.group_windows.values())
+
+        lecturer_days = set((name, slot[0]) for name, slot in b.lecturer_slots)
+        for name, day in lecturer_days:
+            windows = self._day_windows(b.lecturer_slots, {}, name, day)
+            b.lecturer_day_windows[(name, day)] = windows
+            b.lecturer_windows[name] = b.lecturer_windows.get(name, 0) + windows
+        b.lecturer_penalty = sum(2 * windows**2 for windows in b.lecturer_windows.values())
+        return b
+
+    def delta_fitness(self, breakdown: ScoreBreakdown, changes: List[Change]) -> int:
+        """
+        Returns the fitness of the timetable obtained by applying the changes to the breakdown's timetable.
+        The breakdown is left untouched.
+        """
+        return self._rescore(breakdown, changes).fitness
+
+    def derive(self, breakdown: ScoreBreakdown, changes: List[Change]) -> ScoreBreakdown:
+        """
+        Returns the breakdown of the changed timetable, leaving the given one untouched.
+        """
+        child = breakdown.copy()
+        self.apply_changes(child, changes)
+        return child
+
+    def apply_changes(self, breakdown: ScoreBreakdown, changes: List[Change]) -> None:
+        """
+        Updates the breakdown in place so that it describes the changed timetable.
+        """
+        update = self._rescore(breakdown, changes)
+        for counts, deltas in (
+            (breakdown.session_counts, update.session_counts),
+            (breakdown.group_slots, update.group_slots),
+            (breakdown.lecturer_slots, update.lecturer_slots),
+        ):
+            for key, delta in deltas.items():
+                counts[key] = counts.get(key, 0) + delta
+                if counts[key] == 0:
+                    del counts[key]
+        for values, new_values in (
+            (breakdown.group_day_windows, update.group_day_windows),
+            (breakdown.lecturer_day_windows, update.lecturer_day_windows),
+            (breakdown.group_windows, update.group_windows),
+            (breakdown.lecturer_windows, update.lecturer_windows),
+        ):
+            values.update(new_values)
+        breakdown.session_penalty = update.session_penalty
+        breakdown.group_penalty = update.group_penalty
+        breakdown.lecturer_penalty = update.lecturer_penalty
+
+    def _rescore(self, b: ScoreBreakdown, changes: List[Change]) -> ScoreBreakdown:
+        """
+        Returns a ScoreBreakdown whose count dicts hold deltas against b, whose window dicts hold the
+        new values of the affected entries only, and whose penalties are the new totals.
+        """
+        update = ScoreBreakdown()
+        for (group_id, slot), old, new in changes:
+            for assignment, step in ((old, -1), (new, 1)):
+                if assignment is None:
+                    continue
+                subject, lecturer, _, session_type = assignment
+                key = (group_id, subject.name, session_type)
+                update.session_counts[key] = update.session_counts.get(key, 0) + step
+                update.group_slots[(group_id, slot)] = update.group_slots.get((group_id, slot), 0) + step
+                update.lecturer_slots[(lecturer.name, slot)] = update.lecturer_slots.get((lecturer.name, slot), 0) + step
+
+        update.session_penalty = b.session_penalty
+        for (group_id, subject_name, session_type), delta in update.session_counts.items():
+            count = b.session_counts.get((group_id, subject_name, session_type), 0)
+            update.session_penalty += (
+                self._session_term(group_id, subject_name, session_type, count + delta)
+                - self._session_term(group_id, subject_name, session_type, count)
+            )
+
+        update.group_penalty = b.group_penalty + self._rescore_windows(
+            b.group_slots, update.group_slots, b.group_day_windows, b.group_windows,
+            update.group_day_windows, update.group_windows, lambda windows: 10 * windows**4
+        )
+        update.lecturer_penalty = b.lecturer_penalty + self._rescore_windows(
+            b.lecturer_slots, update.lecturer_slots, b.lecturer_day_windows, b.lecturer_windows,
+            update.lecturer_day_windows, update.lecturer_windows, lambda windows: 2 * windows**2
+        )
+        return update
+
+    def _rescore_windows(self, slots, slot_deltas, day_windows, windows, new_day_windows, new_windows, penalty) -> int:
+        """
+        Recomputes the day windows of every (entity, day) touched by slot_deltas and returns the penalty change.
+        """
+        for entity, slot in slot_deltas:
+            key = (entity, slot[0])
+            if key not in new_day_windows:
+                new_day_windows[key] = self._day_windows(slots, slot_deltas, entity, slot[0])
+                new_windows[entity] = (
+                    new_windows.get(entity, windows.get(entity, 0))
+                    - day_windows.get(key, 0) + new_day_windows[key]
+                )
+        return sum(penalty(total) - penalty(windows.get(entity, 0)) for entity, total in new_windows.items())
+
+    def _day_windows(self, slots, slot_deltas, entity: str, day: int) -> int:
+        mask = 0
+        for period in self.day_periods.get(day, []):
+            key = (entity, (day, period))
+            if slots.get(key, 0) + slot_deltas.get(key, 0) > 0:
+                mask |= 1 << period
+        return self.window_table[mask]
+
+    def _session_term(self, group_id: str, subject_name: str, session_type: str, count: int) -> int:
+        multiplicity = self.multiplicity.get((group_id, subject_name), 0)
+        if not multiplicity:
+            return 0
+        difference = abs(count - self.required[(subject_name, session_type)])
+        return multiplicity * (10 * difference)**2
@@ -1,7 +1,49 @@
 from models import Timetable, Group, Subject, Lecturer, Room
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Callable
+import heapq
 import random
-from utils import check_constraints, TIME_SLOTS
+import time
+import warnings
+from utils import check_constraints
+from timegrid import TimeGrid
+from instance import InstanceIndex
+from encoding import TimetableEncoder
+from fitness import BatchFitnessEvaluator, FitnessCache, BreakdownCache, DeltaEvaluator, ScoreBreakdown, Change
+from parallel import ParallelBuilder, build_seeded
+from local_search import LocalSearch
+from construction import ConstructiveBuilder
+from selection import SELECTION_METHODS, truncation_selection, tournament_selection
+from operators import OperatorScheduler
+from instrumentation import Instrumentation, GenerationMetrics, PHASES
+
+SEEDING_MODES = ('random', 'constructive', 'mixed')
+
+class GenerationStats:
+    """
+    Summary of one generation, passed to the run() progress callback.
+    """
+    def __init__(
+        self,
+        generation: int,
+        best_fitness: float,
+        mean_fitness: float,
+        worst_fitness: float,
+        generations_without_improvement: int,
+        elapsed: float
+    ):
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.mean_fitness = mean_fitness
+        self.worst_fitness = worst_fitness
+        self.generations_without_improvement = generations_without_improvement
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return (
+            f"GenerationStats(generation={self.generation}, best_fitness={self.best_fitness}, "
+            f"mean_fitness={self.mean_fitness:.1f}, worst_fitness={self.worst_fitness}, "
+            f"generations_without_improvement={self.generations_without_improvement}, elapsed={self.elapsed:.3f})"
+        )
 
 class GeneticAlgorithm:
     def __init__(
@@ -13,7 +55,24 @@ class GeneticAlgorithm:
         population_size: int = 50,
         generations: int = 100,
         mutation_rate: float = 0.1,
-        crossover_pairs: int = 10
+        crossover_pairs: int = 10,
+        fitness_cache_size: int = 10000,
+        breakdown_cache_size: Optional[int] = None,
+        workers: int = 1,
+        local_search_top_k: int = 0,
+        local_search_steps: int = 20,
+        local_search_neighbourhood: int = 30,
+        tabu_tenure: int = 0,
+        seeding: str = 'random',
+        constructive_ratio: float = 0.5,
+        selection: str = 'truncation',
+        elite_count: int = 10,
+        mutation_count: Optional[int] = None,
+        tournament_size: int = 3,
+        adaptive_operators: bool = True,
+        pack_population: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        grid: Optional[TimeGrid] = None
     ):
         self.groups = groups
         self.subjects = subjects
@@ -26,83 +85,233 @@ class GeneticAlgorithm:
         self.crossover_pairs = crossover_pairs  # Parameter for number of crossover pairs
         self.population: List[Timetable] = []
         self.fitness_scores: List[float] = []
+        self.index = InstanceIndex(groups, subjects, lecturers, rooms, grid)
+        self.grid = self.index.grid
+        self.time_slots: List[Tuple[int, int]] = list(self.grid.slots)
+        if self.index.infeasible_sessions:
+            warnings.warn(
+                "No qualified lecturer or large enough room for: " + ", ".join(
+                    f"{group_id} / {subject_name} / {session_type}"
+                    for group_id, subject_name, session_type in self.index.infeasible_sessions
+                )
+            )
+        self.encoder = TimetableEncoder(groups, subjects, lecturers, rooms, self.grid)
+        # With pack_population, the population is packed into its encoding after every generation
+        # (Timetable.pack), and each individual is decoded again only when an operator reads it.
+        self.pack_population = pack_population
+        self.evaluator = BatchFitnessEvaluator(self.encoder)
+        # With workers > 1, create_population builds the individuals on a process pool, started on
+        # first use; call close() when done.
+        self.workers = workers
+        self._parallel_builder: Optional[ParallelBuilder] = None
+        self.fitness_cache = FitnessCache(fitness_cache_size)
+        self.delta_evaluator = DeltaEvaluator(groups, subjects, self.time_slots)
+        # Score breakdowns of the individuals that may be mutated; twice the population size by default.
+        if breakdown_cache_size is None:
+            breakdown_cache_size = 2 * population_size
+        self.breakdown_cache = BreakdownCache(breakdown_cache_size)
+        self.full_evaluations = 0
+        self.delta_evaluations = 0
+        self.breakdown_scans = 0
+        self.stop_reason: Optional[str] = None
+        # Generations completed so far; run() continues from here, e.g. after load_checkpoint.
+        self.generation = 0
+        # Memetic stage: the local_search_top_k best individuals are improved by local search every generation.
+        self.local_search_top_k = local_search_top_k
+        self.local_search = LocalSearch(self, local_search_steps, local_search_neighbourhood, tabu_tenure)
+        # How new individuals are made: 'random' (generate_valid_schedule), 'constructive'
+        # (ConstructiveBuilder) or 'mixed', which builds a constructive_ratio share of them constructively.
+        if seeding not in SEEDING_MODES:
+            raise ValueError(f"Unknown seeding mode {seeding!r}")
+        self.seeding = seeding
+        self.constructive_ratio = constructive_ratio
+        self.builder = ConstructiveBuilder(self)
+        # Survivor selection: elite_count best individuals are kept unchanged, mutation_count
+        # individuals are mutated (by default mutation_rate * population_size of them), and the rest
+        # of the next population is chosen by the selection method.
+        if selection not in SELECTION_METHODS:
+            raise ValueError(f"Unknown selection method {selection!r}, expected one of {list(SELECTION_METHODS)}")
+        self.selection = selection
+        self.elite_count = elite_count
+        if mutation_count is None:
+            mutation_count = max(1, round(mutation_rate * population_size))
+        self.mutation_count = mutation_count
+        # Each mutated individual gets one operator application per operator. With adaptive_operators
+        # the operator scheduler decides which operators those applications go to.
+        self.operators = {
+            'pop': self._pop_lesson,
+            'insert': self._insert_lesson,
+            'move_to_other_group': self._move_lesson_to_other_group,
+        }
+        self.adaptive_operators = adaptive_operators
+        self.operator_scheduler = OperatorScheduler(list(self.operators))
+        self.tournament_size = tournament_size
+        self.crossovers = 0
+        self.repair_attempts = 0
+        self.repair_successes = 0
+        self.regenerations = 0
+        # Observer of run(); when None, step() takes no timings and run() computes no metrics.
+        self.instrumentation = instrumentation
+        self.phase_seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
 
     def create_population(self):
-        for _ in range(self.population_size):
-            timetable = self.generate_valid_schedule()
-            self.population.append(timetable)
+        """
+        Adds population_size new individuals, as new_schedule makes them, and scores the population.
+        Each individual is built by build_seeded from its own seed, drawn in order from the random
+        module, so a seeded run gets the same population whatever the number of workers.
+        """
+        if self.seeding == 'mixed':
+            constructed = round(self.constructive_ratio * self.population_size)
+            modes = ['constructive' if i < constructed else 'random' for i in range(self.population_size)]
+        else:
+            modes = [None] * self.population_size
+        seeds = [random.getrandbits(64) for _ in modes]
+        if self.workers > 1:
+            if self._parallel_builder is None:
+                self._parallel_builder = ParallelBuilder(self, self.workers)
+            self.population.extend(self._parallel_builder.build(seeds, modes))
+        else:
+            state = random.getstate()
+            for seed, mode in zip(seeds, modes):
+                # Passed through the encoding like the pool's individuals, so their lessons are in the same order.
+                self.population.append(self.encoder.decode(self.encoder.encode(build_seeded(self, seed, mode))))
+            # Building reseeds the random module; the run goes on from the stream the seeds were drawn from.
+            random.setstate(state)
         self.calculate_fitness()
+        self._pack()
+
+    def seed_population(self, timetables: List[Timetable], perturbations: int = 1) -> None:
+        """
+        Starts from the given timetables instead of fresh ones. They are kept unchanged, and the rest
+        of the population is filled with variants of them, each made by up to perturbations random
+        mutation operator applications, so the search begins in their neighbourhood.
+        """
+        self.population = list(timetables[:self.population_size])
+        names = list(self.operators)
+        while len(self.population) < self.population_size:
+            variant = random.choice(timetables)
+            for _ in range(perturbations):
+                result = self.operators[random.choice(names)](variant)
+                if result is not None:
+                    variant = result[0]
+            self.population.append(variant)
+        self.calculate_fitness()
+
+    def new_schedule(self) -> Timetable:
+        """
+        Makes a fresh valid timetable according to the seeding mode.
+        """
+        if self.seeding == 'constructive' or (self.seeding == 'mixed' and random.random() < self.constructive_ratio):
+            return self.builder.build()
+        return self.generate_valid_schedule()
 
     def generate_valid_schedule(self) -> Timetable:
         """
         Generates a timetable that satisfies the hard constraints.
         Assigns lectures and practices separately, ensuring lecturer qualifications.
+        Slots and lecturers are tried in fresh random orders and rooms best fit first;
+        no shared state is modified, so it is safe to call concurrently.
         """
         timetable = Timetable()
-        lecturer_schedule = {}
-        room_schedule = {}
-        group_schedule = {}
 
         for group in self.groups:
+            suitable_rooms = self.index.rooms_for(group)
             for subject_name in group.subjects:
                 subject = self.subjects_dict[subject_name]
-                for session_type in ['Lecture', 'Practice']:
-                    if session_type == 'Lecture' and subject.lecture_hours > 0:
+                for session_type in self.index.session_types[subject_name]:
+                    if session_type == 'Lecture':
                         total_possible_sessions = int(subject.lecture_hours / 5)
-                    elif session_type == 'Practice' and subject.practice_hours > 0:
-                        total_possible_sessions = int(subject.practice_hours / 5)
                     else:
-                        continue 
+                        total_possible_sessions = int(subject.practice_hours / 5)
+                    qualified_lecturers = self.index.lecturers_for(subject_name, session_type)
+                    if not qualified_lecturers or not suitable_rooms:
+                        continue
 
                     sessions_to_assign = random.randint(1, total_possible_sessions)
 
                     for _ in range(sessions_to_assign):
-                        random.shuffle(TIME_SLOTS)
-                        for slot in TIME_SLOTS:
+                        for slot in random.sample(self.time_slots, len(self.time_slots)):
                             key = (group.group_id, slot)
-                            if group_schedule.get((group.group_id, slot)):
+                            if key in timetable.schedule:
                                 continue
 
-                            suitable_lecturers = []
-                            for lecturer in self.lecturers:
-                                if subject.name in lecturer.subjects and session_type in lecturer.subjects[subject.name]:
-                                    suitable_lecturers.append(lecturer)
-                            random.shuffle(suitable_lecturers)
-
-                            lecturer_found = False
-                            for lecturer in suitable_lecturers:
-                                if lecturer_schedule.get((lecturer.name, slot)):
-                                    continue
-
-                                suitable_rooms = [
-                                    room for room in self.rooms if room.capacity >= group.size
-                                ]
-                                random.shuffle(suitable_rooms)
-                                room_found = False
-                                for room in suitable_rooms:
-                                    if room_schedule.get((room.room_id, slot)):
-                                        continue
-
-                                    timetable.schedule[key] = (subject, lecturer, room, session_type)
-                                    group_schedule[(group.group_id, slot)] = True
-                                    lecturer_schedule[(lecturer.name, slot)] = True
-                                    room_schedule[(room.room_id, slot)] = True
-                                    room_found = True
-                                    break
-                                if room_found:
-                                    lecturer_found = True
-                                    break
-                            if lecturer_found:
-                                break
+                            suitable_lecturers = random.sample(qualified_lecturers, len(qualified_lecturers))
+
+                            # Room availability does not depend on the lecturer, so it is looked up once per slot.
+                            room = next(
+                                (room for room in suitable_rooms if (room.room_id, slot) not in timetable.room_slots),
+                                None
+                            )
+                            if room is None:
+                                continue
+                            lecturer = next(
+                                (lecturer for lecturer in suitable_lecturers
+                                 if (lecturer.name, slot) not in timetable.lecturer_slots),
+                                None
+                            )
+                            if lecturer is None:
+                                continue
+
+                            timetable.schedule[key] = (subject, lecturer, room, session_type)
+                            break
         return timetable
 
     def calculate_fitness(self):
-        self.fitness_scores = []
-        for timetable in self.population:
-            fitness = self.calculate_individual_fitness(timetable)
-            self.fitness_scores.append(fitness)
+        self.fitness_scores = self.evaluate(self.population)
+
+    def evaluate(self, timetables: List[Timetable]) -> List[float]:
+        """
+        Returns the fitness of each timetable, scoring only those missing from the fitness cache.
+        """
+        keys = [timetable.fingerprint() for timetable in timetables]
+        scores = [self.fitness_cache.get(key) for key in keys]
+        pending: Dict[int, Timetable] = {}
+        for key, timetable, score in zip(keys, timetables, scores):
+            if score is None:
+                pending.setdefault(key, timetable)
+        if pending:
+            self.full_evaluations += len(pending)
+            for key, score in zip(pending, self.evaluator.evaluate_timetables(list(pending.values()))):
+                self.fitness_cache.put(key, score)
+                pending[key] = score
+            scores = [pending[key] if score is None else score for key, score in zip(keys, scores)]
+        return scores
+
+    def score_change(self, parent: Timetable, child: Timetable, changes: List[Change]) -> float:
+        """
+        Scores a child that differs from its parent only by the given cells and stores the result in the fitness cache.
+        The child's breakdown is recorded as the parent's plus the changes, and is only worked out if
+        the child is later mutated itself.
+        """
+        parent_breakdown = self.breakdown(parent)
+        fitness = self.delta_evaluator.delta_fitness(parent_breakdown, changes)
+        self.fitness_cache.put(child.fingerprint(), fitness)
+        self.breakdown_cache.put(child.fingerprint(), (parent_breakdown, changes))
+        self.delta_evaluations += 1
+        return fitness
+
+    def breakdown(self, timetable: Timetable) -> ScoreBreakdown:
+        """
+        Returns the timetable's ScoreBreakdown from the breakdown cache. A child of a scored mutation
+        gets its parent's breakdown with the changes applied; only other timetables, such as
+        crossover children and fresh ones, are scanned in full. The result must not be modified.
+        """
+        key = timetable.fingerprint()
+        breakdown = self.breakdown_cache.get(key)
+        if breakdown is None:
+            breakdown = self.delta_evaluator.breakdown(timetable)
+            self.breakdown_scans += 1
+            self.breakdown_cache.put(key, breakdown)
+        elif not isinstance(breakdown, ScoreBreakdown):
+            breakdown = self.delta_evaluator.derive(*breakdown)
+            self.breakdown_cache.put(key, breakdown)
+        return breakdown
 
     def calculate_individual_fitness(self, timetable: Timetable) -> float:
+        """
+        Reference scoring of a single timetable.
+        calculate_fitness scores the whole population with BatchFitnessEvaluator, which returns the same values.
+        """
         soft_violations = 0
 
         for group in self.groups:
@@ -146,76 +355,293 @@ class GeneticAlgorithm:
         return fitness
 
     def count_windows(self, slots: List[Tuple[int, int]]) -> int:
-        windows = 0
-        schedule = {}
-        for day, period in slots:
-            schedule.setdefault(day, []).append(period)
-        for periods in schedule.values():
-            periods.sort()
-            for i in range(len(periods) - 1):
-                if periods[i+1] - periods[i] > 1:
-                    windows += periods[i+1] - periods[i] - 1
-        return windows
-
-    def run(self):
-        for generation in range(self.generations):
-            self.calculate_fitness()
-            schedules_with_fitness = list(zip(self.population, self.fitness_scores))
-            schedules_with_fitness.sort(key=lambda x: x[1], reverse=True)
-            best_schedules = [schedule for schedule, _ in schedules_with_fitness[:10]]
-
-            remaining_schedules = [schedule for schedule, _ in schedules_with_fitness[10:]]
-            new_schedules = []
-
-            for _ in range(self.crossover_pairs):
-                parents = random.sample(remaining_schedules, 2)
-                child = self.crossover_days(parents[0], parents[1])
-                if self.validate_schedule(child):
-                    new_schedules.append(child)
-                else:
-                    child = self.generate_valid_schedule()
-                    new_schedules.append(child)
-
-            combined_schedules = remaining_schedules + new_schedules
-
-            schedules_to_mutate = random.sample(combined_schedules, 20)
-            mutated_schedules = []
-            for schedule in schedules_to_mutate:
-                mutated_versions = self.mutate(schedule)
-                mutated_schedules.extend(mutated_versions)
-
-            combined_schedules = [
-                schedule for schedule in combined_schedules if schedule not in schedules_to_mutate
-            ] + mutated_schedules
+        """
+        Returns the free periods between the first and last lesson of each day, summed over days.
+        Each day's periods are folded into a bitmask and looked up in the grid's window table.
+        """
+        return self.grid.count_windows(slots)
 
-            self.population = best_schedules + combined_schedules
+    def run(
+        self,
+        time_budget: Optional[float] = None,
+        target_fitness: Optional[float] = None,
+        patience: Optional[int] = None,
+        callback: Optional[Callable[[Timetable, "GenerationStats"], Optional[bool]]] = None
+    ):
+        """
+        Evolves the population until self.generation reaches self.generations and returns the best timetable.
+        An empty population is created first with create_population.
+        Stops early once time_budget seconds have elapsed, the best fitness reaches target_fitness,
+        or it has not improved for patience generations. After every generation callback is called
+        with the best timetable and the GenerationStats; returning True from it stops the run.
+        The reason the run ended is left in self.stop_reason.
+        time_budget and GenerationStats.elapsed count from the call to run(), so they include building the
+        population when run() creates it, but not a population created beforehand. Building is never cut short:
+        if it exhausts the budget, the run stops after the first generation.
+        Besides callback, progress is reported through self.instrumentation, which receives GenerationMetrics.
+        """
+        started = time.perf_counter()
+        if not self.population:
+            self.create_population()
+        if len(self.fitness_scores) != len(self.population):
             self.calculate_fitness()
-            schedules_with_fitness = list(zip(self.population[10:], self.fitness_scores[10:]))
-            schedules_with_fitness.sort(key=lambda x: x[1], reverse=True)
-            selected_schedules = [schedule for schedule, _ in schedules_with_fitness[:(self.population_size - 10)]]
-
-            self.population = best_schedules + selected_schedules
+        best_so_far = max(self.fitness_scores)
+        stale = 0
+        self.stop_reason = "generations"
+        if self.instrumentation is not None:
+            self.instrumentation.on_run_start(self)
+        for generation in range(self.generation, self.generations):
+            if self.instrumentation is not None:
+                counters = self._counters()
+                self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+                generation_started = time.perf_counter()
+            self.step()
+            best_timetable, best_fitness = self.best()
+            if best_fitness > best_so_far:
+                best_so_far = best_fitness
+                stale = 0
+            else:
+                stale += 1
+            elapsed = time.perf_counter() - started
+            if self.instrumentation is not None:
+                self.instrumentation.on_generation(
+                    self._metrics(generation + 1, elapsed, time.perf_counter() - generation_started, counters)
+                )
+
+            stats = GenerationStats(
+                generation=generation + 1,
+                best_fitness=best_fitness,
+                mean_fitness=sum(self.fitness_scores) / len(self.fitness_scores),
+                worst_fitness=min(self.fitness_scores),
+                generations_without_improvement=stale,
+                elapsed=elapsed
+            )
+            if callback is not None and callback(best_timetable, stats):
+                self.stop_reason = "callback"
+            elif target_fitness is not None and best_fitness >= target_fitness:
+                self.stop_reason = "target_fitness"
+            elif patience is not None and stale >= patience:
+                self.stop_reason = "patience"
+            elif time_budget is not None and elapsed >= time_budget:
+                self.stop_reason = "time_budget"
+            else:
+                continue
+            break
+
+        if self.instrumentation is not None:
+            self.instrumentation.on_run_end(self)
+        return self.best()[0]
+
+    def _counters(self) -> Dict:
+        """
+        Snapshot of the cumulative counters, so that a generation's metrics can be taken as differences.
+        """
+        scheduler = self.operator_scheduler
+        return {
+            'evaluations': self.full_evaluations + self.delta_evaluations + self.local_search.evaluations,
+            'crossovers': self.crossovers,
+            'repair_attempts': self.repair_attempts,
+            'repair_successes': self.repair_successes,
+            'regenerations': self.regenerations,
+            'operators': {
+                name: (scheduler.applications[name], scheduler.valid[name], scheduler.successes[name])
+                for name in scheduler.names
+            },
+        }
+
+    def _metrics(self, generation: int, elapsed: float, generation_seconds: float, before: Dict) -> GenerationMetrics:
+        scheduler = self.operator_scheduler
+        crossovers = self.crossovers - before['crossovers']
+        repaired = self.repair_successes - before['repair_successes']
+        needed_repair = self.repair_attempts - before['repair_attempts']
+        operators = {}
+        for name in scheduler.names:
+            applied, valid, improved = before['operators'][name]
+            operators[name] = {
+                'applied': scheduler.applications[name] - applied,
+                'valid': scheduler.valid[name] - valid,
+                'improved': scheduler.successes[name] - improved,
+            }
+        best_timetable, best_fitness = self.best()
+        distinct_ratio = mean_distance_to_best = None
+        if self.instrumentation.diversity:
+            best_items = set(best_timetable.schedule.items())
+            distances = [len(best_items.symmetric_difference(timetable.schedule.items())) for timetable in self.population]
+            distinct_ratio = len(set(timetable.fingerprint() for timetable in self.population)) / len(self.population)
+            mean_distance_to_best = sum(distances) / len(distances)
+        return GenerationMetrics(
+            generation=generation,
+            best_fitness=best_fitness,
+            mean_fitness=sum(self.fitness_scores) / len(self.fitness_scores),
+            worst_fitness=min(self.fitness_scores),
+            elapsed=elapsed,
+            generation_seconds=generation_seconds,
+            phase_seconds=self.phase_seconds,
+            evaluations=self.full_evaluations + self.delta_evaluations + self.local_search.evaluations - before['evaluations'],
+            crossovers=crossovers,
+            crossover_valid=crossovers - needed_repair,
+            repaired=repaired,
+            regenerated=self.regenerations - before['regenerations'],
+            operators=operators,
+            distinct_ratio=distinct_ratio,
+            mean_distance_to_best=mean_distance_to_best
+        )
+
+    def _lap(self, phase: str, since: float) -> float:
+        """
+        Adds the time since the given perf_counter reading to the phase and returns the current reading.
+        """
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - since
+        return now
 
+    def step(self) -> None:
+        """
+        Evolves the population by one generation: elitism, crossover, mutation and selection.
+        With instrumentation, the time of each phase is added to self.phase_seconds.
+        """
+        timed = self.instrumentation is not None
+        mark = time.perf_counter() if timed else 0.0
+        if len(self.fitness_scores) != len(self.population):
             self.calculate_fitness()
+            if timed:
+                mark = self._lap('fitness', mark)
+        elite_indices = truncation_selection(self.fitness_scores, min(self.elite_count, len(self.population)))
+        best_schedules = [self.population[i] for i in elite_indices]
+        best_scores = [self.fitness_scores[i] for i in elite_indices]
+
+        elite_ids = set(elite_indices)
+        remaining_schedules = [schedule for i, schedule in enumerate(self.population) if i not in elite_ids]
+        parent_pool = remaining_schedules if len(remaining_schedules) >= 2 else self.population
+        new_schedules = []
+        if timed:
+            mark = self._lap('selection', mark)
+
+        for _ in range(self.crossover_pairs if len(parent_pool) >= 2 else 0):
+            parents = random.sample(parent_pool, 2)
+            child = self.crossover_days(parents[0], parents[1])
+            self.crossovers += 1
+            if timed:
+                mark = self._lap('crossover', mark)
+            valid = self.validate_schedule(child) or self.repair(child)
+            if timed:
+                mark = self._lap('validation', mark)
+            if not valid:
+                child = self.new_schedule()
+                self.regenerations += 1
+                if timed:
+                    mark = self._lap('regeneration', mark)
+            new_schedules.append(child)
+
+        combined_schedules = remaining_schedules + new_schedules
+
+        schedules_to_mutate = random.sample(combined_schedules, min(self.mutation_count, len(combined_schedules)))
+        mutated_schedules = []
+        for schedule in schedules_to_mutate:
+            if self.adaptive_operators:
+                mutated_versions = self.mutate_adaptive(schedule, len(self.operators))
+            else:
+                mutated_versions = self.mutate(schedule)
+            mutated_schedules.extend(mutated_versions)
+
+        mutated_ids = set(id(schedule) for schedule in schedules_to_mutate)
+        combined_schedules = [
+            schedule for schedule in combined_schedules if id(schedule) not in mutated_ids
+        ] + mutated_schedules
+        if timed:
+            mark = self._lap('mutation', mark)
+
+        combined_scores = self.evaluate(combined_schedules)
+        if timed:
+            mark = self._lap('fitness', mark)
+        selected = self.select(combined_scores, max(self.population_size - len(best_schedules), 0))
+
+        self.population = best_schedules + [combined_schedules[i] for i in selected]
+        self.fitness_scores = best_scores + [combined_scores[i] for i in selected]
+        if timed:
+            mark = self._lap('selection', mark)
+
+        if self.local_search_top_k:
+            self.improve_elites(self.local_search_top_k)
+            if timed:
+                self._lap('local_search', mark)
+        self._pack()
+        self.generation += 1
+
+    def _pack(self) -> None:
+        if self.pack_population:
+            for timetable in self.population:
+                timetable.pack(self.encoder)
+
+    def improve_elites(self, count: int) -> None:
+        """
+        Runs local search on the count best individuals and keeps the improved versions in their place.
+        """
+        for index in truncation_selection(self.fitness_scores, count):
+            improved, fitness = self.local_search.improve(self.population[index], self.fitness_scores[index])
+            if fitness > self.fitness_scores[index]:
+                self.fitness_cache.put(improved.fingerprint(), fitness)
+                self.population[index] = improved
+                self.fitness_scores[index] = fitness
+
+    def select(self, scores: List[float], count: int) -> List[int]:
+        """
+        Returns the indices of the count survivors chosen by the configured selection method.
+        """
+        if self.selection == 'tournament':
+            return tournament_selection(scores, count, self.tournament_size)
+        return SELECTION_METHODS[self.selection](scores, count)
 
-            best_fitness = max(self.fitness_scores)
-            print(f"Generation {generation + 1}: Best Fitness = {best_fitness}")
-
+    def best(self) -> Tuple[Timetable, float]:
+        """
+        Returns the fittest individual of the current population and its fitness.
+        """
         best_index = self.fitness_scores.index(max(self.fitness_scores))
-        return self.population[best_index]
+        return self.population[best_index], self.fitness_scores[best_index]
+
+    def top(self, count: int) -> List[Timetable]:
+        """
+        Returns the count fittest individuals of the current population, best first.
+        """
+        return [self.population[i] for i in truncation_selection(self.fitness_scores, count)]
+
+    def immigrate(self, timetables: List[Timetable]) -> int:
+        """
+        Replaces the weakest individuals with the valid incoming timetables.
+        Returns how many were accepted.
+        """
+        incoming = [timetable for timetable in timetables if self.validate_schedule(timetable)]
+        scores = self.evaluate(incoming)
+        weakest = heapq.nsmallest(len(incoming), range(len(self.population)), key=self.fitness_scores.__getitem__)
+        for index, timetable, fitness in zip(weakest, incoming, scores):
+            self.population[index] = timetable
+            self.fitness_scores[index] = fitness
+        return min(len(incoming), len(weakest))
 
     def crossover_days(self, parent1: Timetable, parent2: Timetable) -> Timetable:
         """
         Performs crossover by dividing days into two sets and combining schedules.
+        Parents that keep their encoding, such as packed ones, are combined on it without decoding them.
         """
-        days = list(set(slot[0] for (_, slot) in parent1.schedule.keys()))
+        encoded1 = parent1.encoding(self.encoder)
+        encoded2 = parent2.encoding(self.encoder)
+        if encoded1 is not None and encoded2 is not None:
+            days = self.encoder.days(encoded1)
+        else:
+            days = list(set(slot[0] for (_, slot) in parent1.schedule.keys()))
         if not days:
-            days = list(range(5)) 
+            days = list(range(self.grid.n_days))
         random.shuffle(days)
         split_point = len(days) // 2
         days_A = set(days[:split_point])
         days_B = set(days[split_point:])
 
+        if encoded1 is not None and encoded2 is not None:
+            encoded = self.encoder.combine_days(encoded1, encoded2, days_A, days_B)
+            child = self.encoder.decode(encoded)
+            child.keep_encoding(self.encoder, encoded)
+            return child
+
         child = Timetable()
 
         for (group_id, slot), assignment in parent1.schedule.items():
@@ -238,96 +664,179 @@ class GeneticAlgorithm:
         - Schedule 3: base schedule with a lesson popped from one group and a lesson added for another group (if valid)
         Returns a list of valid schedules.
         """
-        new_schedules = []
+        new_schedules = [timetable]
+        for name in self.operators:
+            child = self.apply_operator(name, timetable)
+            if child is not None:
+                new_schedules.append(child)
+        return new_schedules
 
-        new_schedules.append(timetable)
+    def mutate_adaptive(self, timetable: Timetable, applications: int) -> List[Timetable]:
+        """
+        Like mutate, but spends the given number of operator applications on operators drawn by the
+        operator scheduler, which favours the operators that have been improving fitness.
+        """
+        new_schedules = [timetable]
+        for _ in range(applications):
+            child = self.apply_operator(self.operator_scheduler.choose(), timetable)
+            if child is not None:
+                new_schedules.append(child)
+        return new_schedules
 
-        timetable_popped = Timetable()
-        timetable_popped.schedule = timetable.schedule.copy()
-        if timetable_popped.schedule:
-            key_to_remove = random.choice(list(timetable_popped.schedule.keys()))
-            timetable_popped.schedule.pop(key_to_remove)
-            if self.validate_schedule(timetable_popped):
-                new_schedules.append(timetable_popped)
+    def apply_operator(self, name: str, timetable: Timetable) -> Optional[Timetable]:
+        """
+        Applies one mutation operator, scores a valid child incrementally and records the outcome
+        with the operator scheduler. Returns the child, or None if the operator produced no valid one.
+        """
+        result = self.operators[name](timetable)
+        if result is None:
+            self.operator_scheduler.record(name, None)
+            return None
+        child, changes = result
+        encoded = timetable.encoding(self.encoder)
+        if encoded is not None:
+            # The child of a packed parent gets its encoding from the parent's, so packing it is cheap.
+            child.keep_encoding(self.encoder, self.encoder.apply_changes(encoded, changes))
+        fitness = self.score_change(timetable, child, changes)
+        self.operator_scheduler.record(name, fitness - self.breakdown(timetable).fitness)
+        return child
 
-        timetable_inserted = Timetable()
-        timetable_inserted.schedule = timetable.schedule.copy()
-        group = random.choice(self.groups)
+    def _pop_lesson(self, timetable: Timetable) -> Optional[Tuple[Timetable, List[Change]]]:
+        if not timetable.schedule:
+            return None
+        key_to_remove = timetable.schedule.random_key()
+        timetable_popped = timetable.derive()
+        removed = timetable_popped.schedule.pop(key_to_remove)
+        if not self.validate_schedule(timetable_popped):
+            return None
+        return timetable_popped, [(key_to_remove, removed, None)]
+
+    def _insert_lesson(self, timetable: Timetable) -> Optional[Tuple[Timetable, List[Change]]]:
+        lesson = self._random_lesson(timetable, random.choice(self.groups))
+        if lesson is None:
+            return None
+        key, assignment = lesson
+        timetable_inserted = timetable.derive()
+        timetable_inserted.schedule[key] = assignment
+        if not self.validate_schedule(timetable_inserted):
+            return None
+        return timetable_inserted, [(key, None, assignment)]
+
+    def _move_lesson_to_other_group(self, timetable: Timetable) -> Optional[Tuple[Timetable, List[Change]]]:
+        if not timetable.schedule:
+            return None
+        # Looked up slot by slot rather than read from the whole schedule, which would compact an overlay.
+        schedule = timetable.schedule
+        group_ids_with_lessons = [
+            group.group_id for group in self.groups
+            if any((group.group_id, slot) in schedule for slot in self.time_slots)
+        ]
+        group_id_to_pop = random.choice(group_ids_with_lessons)
+        group_lessons = [(group_id_to_pop, slot) for slot in self.time_slots if (group_id_to_pop, slot) in schedule]
+        key_to_remove = random.choice(group_lessons)
+        timetable_swap = timetable.derive()
+        removed = timetable_swap.schedule.pop(key_to_remove)
+
+        other_groups = [group for group in self.groups if group.group_id != group_id_to_pop]
+        if not other_groups:
+            return None
+        lesson = self._random_lesson(timetable_swap, random.choice(other_groups))
+        if lesson is None:
+            return None
+        key, assignment = lesson
+        timetable_swap.schedule[key] = assignment
+        if not self.validate_schedule(timetable_swap):
+            return None
+        return timetable_swap, [(key_to_remove, removed, None), (key, None, assignment)]
+
+    def _random_lesson(self, timetable: Timetable, group: Group) -> Optional[Tuple[Tuple[str, Tuple[int, int]], Tuple[Subject, Lecturer, Room, str]]]:
+        """
+        Draws a random session of one of the group's subjects at a random slot, with a random qualified
+        lecturer and feasible room. Returns None if the draw cannot be placed in the timetable.
+        """
         new_subject_name = random.choice(group.subjects)
-        new_subject = self.subjects_dict[new_subject_name]
-        possible_session_types = []
-        if new_subject.lecture_hours > 0:
-            possible_session_types.append('Lecture')
-        if new_subject.practice_hours > 0:
-            possible_session_types.append('Practice')
+        possible_session_types = self.index.session_types[new_subject_name]
         if not possible_session_types:
-            return new_schedules
+            return None
         session_type = random.choice(possible_session_types)
-        new_slot = random.choice(TIME_SLOTS)
-        suitable_lecturers = [
-            lect for lect in self.lecturers
-            if new_subject.name in lect.subjects and session_type in lect.subjects[new_subject.name]
-        ]
-        if suitable_lecturers:
-            new_lecturer = random.choice(suitable_lecturers)
-            suitable_rooms = [room for room in self.rooms if room.capacity >= group.size]
-            if suitable_rooms:
-                new_room = random.choice(suitable_rooms)
-                if self.is_assignment_valid(timetable_inserted, group.group_id, new_slot, new_lecturer, new_room):
-                    timetable_inserted.schedule[(group.group_id, new_slot)] = (new_subject, new_lecturer, new_room, session_type)
-                    if self.validate_schedule(timetable_inserted):
-                        new_schedules.append(timetable_inserted)
-
-        timetable_swap = Timetable()
-        timetable_swap.schedule = timetable.schedule.copy()
-        if timetable_swap.schedule:
-            group_ids_with_lessons = set(group_id for (group_id, _) in timetable_swap.schedule.keys())
-            group_id_to_pop = random.choice(list(group_ids_with_lessons))
-            group_lessons = [key for key in timetable_swap.schedule.keys() if key[0] == group_id_to_pop]
-            key_to_remove = random.choice(group_lessons)
-            timetable_swap.schedule.pop(key_to_remove)
-
-            other_groups = [group for group in self.groups if group.group_id != group_id_to_pop]
-            if other_groups:
-                group_to_add = random.choice(other_groups)
-                new_subject_name = random.choice(group_to_add.subjects)
-                new_subject = self.subjects_dict[new_subject_name]
-                possible_session_types = []
-                if new_subject.lecture_hours > 0:
-                    possible_session_types.append('Lecture')
-                if new_subject.practice_hours > 0:
-                    possible_session_types.append('Practice')
-                if possible_session_types:
-                    session_type = random.choice(possible_session_types)
-                    new_slot = random.choice(TIME_SLOTS)
-                    suitable_lecturers = [
-                        lect for lect in self.lecturers
-                        if new_subject.name in lect.subjects and session_type in lect.subjects[new_subject.name]
-                    ]
-                    if suitable_lecturers:
-                        new_lecturer = random.choice(suitable_lecturers)
-                        suitable_rooms = [room for room in self.rooms if room.capacity >= group_to_add.size]
-                        if suitable_rooms:
-                            new_room = random.choice(suitable_rooms)
-                            if self.is_assignment_valid(timetable_swap, group_to_add.group_id, new_slot, new_lecturer, new_room):
-                                timetable_swap.schedule[(group_to_add.group_id, new_slot)] = (new_subject, new_lecturer, new_room, session_type)
-                                if self.validate_schedule(timetable_swap):
-                                    new_schedules.append(timetable_swap)
-        return new_schedules
+        new_slot = random.choice(self.time_slots)
+        suitable_lecturers = self.index.lecturers_for(new_subject_name, session_type)
+        suitable_rooms = self.index.rooms_for(group)
+        if not suitable_lecturers or not suitable_rooms:
+            return None
+        new_lecturer = random.choice(suitable_lecturers)
+        new_room = random.choice(suitable_rooms)
+        if not self.is_assignment_valid(timetable, group.group_id, new_slot, new_lecturer, new_room):
+            return None
+        return (group.group_id, new_slot), (self.subjects_dict[new_subject_name], new_lecturer, new_room, session_type)
+
+    def repair(self, timetable: Timetable) -> bool:
+        """
+        Resolves hard-constraint clashes in place instead of discarding the timetable.
+        Each lesson involved in a clash is taken out and placed again: in the same slot with another
+        free lecturer or room if possible, otherwise in another free slot of its group, and it is
+        dropped only if no alternative exists. Only the clashing slots are inspected.
+        Returns True if the timetable is valid afterwards.
+        """
+        self.repair_attempts += 1
+        clashing_slots = sorted(set(
+            slot for counts in (timetable.lecturer_slots, timetable.room_slots)
+            for (_, slot), count in counts.items() if count > 1
+        ))
+        for slot in clashing_slots:
+            for group in self.groups:
+                key = (group.group_id, slot)
+                assignment = timetable.schedule.get(key)
+                if assignment is None:
+                    continue
+                _, lecturer, room, _ = assignment
+                if timetable.lecturer_slots[(lecturer.name, slot)] == 1 and timetable.room_slots[(room.room_id, slot)] == 1:
+                    continue
+                del timetable.schedule[key]
+                placement = self._find_placement(timetable, group, assignment, slot)
+                if placement is not None:
+                    new_slot, new_assignment = placement
+                    timetable.schedule[(group.group_id, new_slot)] = new_assignment
+        repaired = self.validate_schedule(timetable)
+        if repaired:
+            self.repair_successes += 1
+        return repaired
+
+    def _find_placement(self, timetable: Timetable, group: Group, assignment: Tuple[Subject, Lecturer, Room, str],
+                        preferred_slot: Tuple[int, int]) -> Optional[Tuple[Tuple[int, int], Tuple[Subject, Lecturer, Room, str]]]:
+        """
+        Finds a free (slot, assignment) for the group's lesson, preferring the given slot and the lesson's
+        own lecturer and room. Returns None if there is none.
+        """
+        subject, lecturer, room, session_type = assignment
+        lecturers = [lecturer] + [other for other in self.index.lecturers_for(subject.name, session_type) if other is not lecturer]
+        rooms = [room] + [other for other in self.index.rooms_for(group) if other is not room]
+        other_slots = [slot for slot in self.time_slots if slot != preferred_slot]
+        for slot in [preferred_slot] + random.sample(other_slots, len(other_slots)):
+            if (group.group_id, slot) in timetable.schedule:
+                continue
+            for candidate_lecturer in lecturers:
+                if (candidate_lecturer.name, slot) in timetable.lecturer_slots:
+                    continue
+                for candidate_room in rooms:
+                    if timetable.is_free(group.group_id, slot, candidate_lecturer, candidate_room):
+                        return slot, (subject, candidate_lecturer, candidate_room, session_type)
+        return None
 
     def is_assignment_valid(self, timetable: Timetable, group_id: str, slot: Tuple[int, int],
                             lecturer: Lecturer, room: Room) -> bool:
         """
         Checks if assigning a lesson at the given slot for the group, lecturer, and room is valid.
         """
-        if (group_id, slot) in timetable.schedule:
-            return False
+        return timetable.is_free(group_id, slot, lecturer, room)
 
-        for (other_group_id, other_slot), (_, other_lecturer, other_room, _) in timetable.schedule.items():
-            if other_slot == slot:
-                if other_lecturer.name == lecturer.name or other_room.room_id == room.room_id:
-                    return False
-        return True
+    def close(self) -> None:
+        """
+        Releases the worker processes of the parallel builder, if any.
+        """
+        if self._parallel_builder is not None:
+            self._parallel_builder.close()
+            self._parallel_builder = None
 
     def validate_schedule(self, timetable: Timetable) -> bool:
         """
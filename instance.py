@@ -0,0 +1,63 @@
+from models import Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Optional
+from timegrid import TimeGrid
+from encoding import SESSION_TYPES
+
+class InstanceIndex:
+    """
+    Lookup tables derived once from the instance data:
+    - qualified_lecturers: (subject name, session type) -> lecturers allowed to teach it
+    - feasible_rooms: group id -> rooms large enough for the group, best fit (smallest) first
+    - session_types: subject name -> session types the subject has hours for
+    - infeasible_sessions: (group id, subject name, session type) triples that can never be scheduled,
+      because no lecturer is qualified or no room fits the group
+    - grid: the TimeGrid of teaching slots (5 days of 4 periods unless given)
+    """
+    def __init__(
+        self,
+        groups: List[Group],
+        subjects: List[Subject],
+        lecturers: List[Lecturer],
+        rooms: List[Room],
+        grid: Optional[TimeGrid] = None
+    ):
+        self.grid = grid if grid is not None else TimeGrid()
+        self.qualified_lecturers: Dict[Tuple[str, str], List[Lecturer]] = {}
+        for lecturer in lecturers:
+            for subject_name, session_types in lecturer.subjects.items():
+                for session_type in dict.fromkeys(session_types):
+                    self.qualified_lecturers.setdefault((subject_name, session_type), []).append(lecturer)
+
+        self.feasible_rooms: Dict[str, List[Room]] = {
+            group.group_id: sorted(
+                (room for room in rooms if room.capacity >= group.size),
+                key=lambda room: room.capacity
+            )
+            for group in groups
+        }
+
+        self.session_types: Dict[str, List[str]] = {}
+        for subject in subjects:
+            self.session_types[subject.name] = [
+                session_type for session_type, hours in zip(SESSION_TYPES, (subject.lecture_hours, subject.practice_hours))
+                if hours > 0
+            ]
+
+        self.infeasible_sessions: List[Tuple[str, str, str]] = []
+        for group in groups:
+            for subject_name in group.subjects:
+                for session_type in self.session_types.get(subject_name, []):
+                    if not self.lecturers_for(subject_name, session_type) or not self.feasible_rooms[group.group_id]:
+                        self.infeasible_sessions.append((group.group_id, subject_name, session_type))
+
+    def lecturers_for(self, subject_name: str, session_type: str) -> List[Lecturer]:
+        return self.qualified_lecturers.get((subject_name, session_type), [])
+
+    def rooms_for(self, group: Group) -> List[Room]:
+        return self.feasible_rooms[group.group_id]
+
+    def __repr__(self) -> str:
+        return (
+            f"InstanceIndex(qualified_pairs={len(self.qualified_lecturers)}, "
+            f"groups={len(self.feasible_rooms)}, infeasible_sessions={len(self.infeasible_sessions)})"
+        )
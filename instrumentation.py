@@ -0,0 +1,147 @@
+import json
+import sys
+from typing import Dict, Optional, TextIO
+
+PHASES = ('fitness', 'crossover', 'validation', 'regeneration', 'mutation', 'selection', 'local_search')
+
+class GenerationMetrics:
+    """
+    Measurements of one generation of GeneticAlgorithm.run.
+    phase_seconds holds the time spent in each of PHASES; validation includes repairing crossover
+    children and mutation includes the incremental scoring of the mutated children.
+    evaluations counts full fitness evaluations plus incremental (delta and local search) ones, cache hits excluded.
+    operators maps each mutation operator to its applications, valid children and improving children.
+    distinct_ratio is the share of individuals with distinct fingerprints, and mean_distance_to_best the
+    mean number of (cell, assignment) entries an individual does not share with the best one; both are
+    None unless the instrumentation asked for them through its diversity attribute, as they read every
+    individual in full.
+    """
+    def __init__(
+        self,
+        generation: int,
+        best_fitness: float,
+        mean_fitness: float,
+        worst_fitness: float,
+        elapsed: float,
+        generation_seconds: float,
+        phase_seconds: Dict[str, float],
+        evaluations: int,
+        crossovers: int,
+        crossover_valid: int,
+        repaired: int,
+        regenerated: int,
+        operators: Dict[str, Dict[str, int]],
+        distinct_ratio: Optional[float] = None,
+        mean_distance_to_best: Optional[float] = None
+    ):
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.mean_fitness = mean_fitness
+        self.worst_fitness = worst_fitness
+        self.elapsed = elapsed
+        self.generation_seconds = generation_seconds
+        self.phase_seconds = phase_seconds
+        self.evaluations = evaluations
+        self.crossovers = crossovers
+        self.crossover_valid = crossover_valid
+        self.repaired = repaired
+        self.regenerated = regenerated
+        self.operators = operators
+        self.distinct_ratio = distinct_ratio
+        self.mean_distance_to_best = mean_distance_to_best
+
+    @property
+    def evaluations_per_second(self) -> float:
+        return self.evaluations / self.generation_seconds if self.generation_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        record = dict(vars(self))
+        record['evaluations_per_second'] = self.evaluations_per_second
+        return record
+
+    def __repr__(self) -> str:
+        return (
+            f"GenerationMetrics(generation={self.generation}, best_fitness={self.best_fitness}, "
+            f"generation_seconds={self.generation_seconds:.4f}, evaluations={self.evaluations})"
+        )
+
+class Instrumentation:
+    """
+    Hook interface for observing GeneticAlgorithm.run. All methods do nothing; subclasses override
+    the ones they need. Without an instrumentation object the algorithm skips all measurements.
+    The population diversity metrics are only computed when diversity is True.
+    """
+    diversity: bool = False
+
+    def on_run_start(self, ga) -> None:
+        pass
+
+    def on_generation(self, metrics: GenerationMetrics) -> None:
+        pass
+
+    def on_run_end(self, ga) -> None:
+        pass
+
+class ConsoleInstrumentation(Instrumentation):
+    """
+    Prints the best fitness every generation and the cache, operator and crossover statistics at the end.
+    """
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def on_generation(self, metrics: GenerationMetrics) -> None:
+        print(f"Generation {metrics.generation}: Best Fitness = {metrics.best_fitness}", file=self.stream or sys.stdout)
+
+    def on_run_end(self, ga) -> None:
+        stream = self.stream or sys.stdout
+        print(
+            f"Fitness cache: {ga.fitness_cache.hits} hits, {ga.fitness_cache.misses} misses "
+            f"(hit rate {ga.fitness_cache.hit_rate:.1%}), {ga.delta_evaluations} delta evaluations, "
+            f"{ga.local_search.evaluations} local search move evaluations",
+            file=stream
+        )
+        print(f"Operators: {ga.operator_scheduler.summary()}", file=stream)
+        if ga.crossovers:
+            print(
+                f"Crossover: {ga.crossovers} children, {ga.repair_attempts} needed repair, "
+                f"{ga.repair_successes} repaired, {ga.regenerations} regenerated "
+                f"(regeneration rate {ga.regenerations / ga.crossovers:.1%})",
+                file=stream
+            )
+        print(f"Stopped by: {ga.stop_reason}", file=stream)
+
+class JsonLinesInstrumentation(Instrumentation):
+    """
+    Writes one JSON object per generation, followed by a final {"event": "run_end", ...} record,
+    to the given path (appending) or open text stream. With diversity=True the generation records
+    also carry distinct_ratio and mean_distance_to_best.
+    """
+    def __init__(self, target, diversity: bool = False):
+        self.diversity = diversity
+        self._owned = isinstance(target, str)
+        self.stream: TextIO = open(target, mode="a") if self._owned else target
+
+    def on_generation(self, metrics: GenerationMetrics) -> None:
+        self.stream.write(json.dumps(dict(event="generation", **metrics.to_dict())) + "\n")
+
+    def on_run_end(self, ga) -> None:
+        record = {
+            "event": "run_end",
+            "stop_reason": ga.stop_reason,
+            "best_fitness": ga.best()[1],
+            "cache_hits": ga.fitness_cache.hits,
+            "cache_misses": ga.fitness_cache.misses,
+            "full_evaluations": ga.full_evaluations,
+            "delta_evaluations": ga.delta_evaluations,
+            "local_search_evaluations": ga.local_search.evaluations,
+            "crossovers": ga.crossovers,
+            "repair_attempts": ga.repair_attempts,
+            "repair_successes": ga.repair_successes,
+            "regenerations": ga.regenerations,
+        }
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self._owned:
+            self.stream.close()
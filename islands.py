@@ -0,0 +1,149 @@
+import queue
+import random
+import multiprocessing
+import traceback
+from models import Timetable, Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Optional
+from encoding import TimetableEncoder, EncodedTimetable
+from genetic_algorithm import GeneticAlgorithm
+from timegrid import TimeGrid
+
+TOPOLOGIES = ('ring', 'complete')
+# How often run_islands checks on the island processes while it waits for their results.
+RESULT_POLL_SECONDS = 1.0
+
+def migration_targets(island: int, islands: int, topology: str) -> List[int]:
+    """
+    Returns the islands that receive migrants from the given island.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+    if islands < 2:
+        return []
+    if topology == 'ring':
+        return [(island + 1) % islands]
+    return [other for other in range(islands) if other != island]
+
+def _island_main(
+    island: int,
+    instance: Tuple[List[Group], List[Subject], List[Lecturer], List[Room]],
+    options: Dict,
+    seed: Optional[int],
+    generations: int,
+    migration_interval: int,
+    migrants: int,
+    targets: List[int],
+    incoming: int,
+    inboxes: List[multiprocessing.Queue],
+    results: multiprocessing.Queue
+) -> None:
+    """
+    Evolves one island. After every migration_interval generations it sends the encodings of its
+    migrants best individuals to its targets and waits for the migrants of its incoming neighbours.
+    Migrants are ordered by sender before they are accepted, so a seeded run is reproducible.
+    If the island fails, or a neighbour reports that it failed, it sends (island, None) instead of
+    migrants to its targets, so they do not wait for it, and (island, None, traceback) as its result.
+    """
+    ga = None
+    try:
+        if seed is not None:
+            random.seed(seed + island)
+        ga = GeneticAlgorithm(*instance, generations=generations, **options)
+        ga.create_population()
+
+        done = 0
+        while done < generations:
+            for _ in range(min(migration_interval, generations - done)):
+                ga.step()
+            done += migration_interval
+            if done >= generations or not targets:
+                continue
+            cells = [ga.encoder.encode(timetable).cells for timetable in ga.top(migrants)]
+            for target in targets:
+                inboxes[target].put((island, cells))
+            messages = []
+            for _ in range(incoming):
+                sender, batch = inboxes[island].get()
+                if batch is None:
+                    raise RuntimeError(f"Neighbouring island {sender} failed")
+                messages.append((sender, batch))
+            messages.sort(key=lambda message: message[0])
+            ga.immigrate([
+                ga.encoder.decode(EncodedTimetable(encoded))
+                for _, batch in messages for encoded in batch
+            ])
+
+        best, fitness = ga.best()
+        results.put((island, ga.encoder.encode(best).cells, fitness))
+    except Exception:
+        for target in targets:
+            inboxes[target].put((island, None))
+        results.put((island, None, traceback.format_exc()))
+    finally:
+        if ga is not None:
+            ga.close()
+
+def run_islands(
+    groups: List[Group],
+    subjects: List[Subject],
+    lecturers: List[Lecturer],
+    rooms: List[Room],
+    islands: int = 4,
+    generations: int = 100,
+    migration_interval: int = 10,
+    migrants: int = 2,
+    topology: str = 'ring',
+    seed: Optional[int] = None,
+    **options
+) -> Tuple[Timetable, float]:
+    """
+    Runs independent GeneticAlgorithm populations in separate processes with periodic migration.
+    Every migration_interval generations each island sends its migrants best individuals to its
+    neighbours in the topology ('ring' or 'complete'), where they replace the weakest individuals.
+    Remaining keyword options are passed to every GeneticAlgorithm.
+    Returns the best timetable over all islands and its fitness.
+    Raises RuntimeError if an island fails or its process dies; the other islands are then terminated.
+    """
+    targets = [migration_targets(island, islands, topology) for island in range(islands)]
+    incoming = [sum(island in island_targets for island_targets in targets) for island in range(islands)]
+    inboxes = [multiprocessing.Queue() for _ in range(islands)]
+    results = multiprocessing.Queue()
+    instance = (groups, subjects, lecturers, rooms)
+
+    processes = [
+        multiprocessing.Process(
+            target=_island_main,
+            args=(
+                island, instance, options, seed, generations, migration_interval, migrants,
+                targets[island], incoming[island], inboxes, results
+            )
+        )
+        for island in range(islands)
+    ]
+    outcomes: Dict[int, Tuple] = {}
+    try:
+        for process in processes:
+            process.start()
+        while len(outcomes) < islands:
+            try:
+                island, cells, fitness = results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                # An island that exits normally has sent its result first; one that died could not.
+                for island, process in enumerate(processes):
+                    if island not in outcomes and process.exitcode not in (None, 0):
+                        raise RuntimeError(f"Island {island} exited with code {process.exitcode}")
+                continue
+            if cells is None:
+                raise RuntimeError(f"Island {island} failed:\n{fitness}")
+            outcomes[island] = (cells, fitness)
+    finally:
+        for process in processes:
+            if process.is_alive() and len(outcomes) < islands:
+                process.terminate()
+            if process.pid is not None:
+                process.join()
+
+    cells, fitness = max((outcomes[island] for island in sorted(outcomes)), key=lambda outcome: outcome[1])
+    grid = options.get('grid') or TimeGrid()
+    encoder = TimetableEncoder(groups, subjects, lecturers, rooms, grid)
+    return encoder.decode(EncodedTimetable(cells)), fitness
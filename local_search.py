@@ -0,0 +1,133 @@
+import random
+from models import Timetable, Group
+from typing import List, Dict, Tuple, Optional
+from fitness import Change
+
+class LocalSearch:
+    """
+    Memetic improvement stage for elite timetables.
+    Each step samples up to neighbourhood candidate moves, scores them with the delta evaluator and
+    applies the best one. Moves drop a lesson, insert a session of one of the group's subjects, relocate
+    a lesson to another free slot of its group, or swap the slots of two lessons of the same group;
+    all of them keep the timetable valid.
+    With tabu_tenure == 0 this is steepest descent on the sample and stops at the first step without
+    an improving move. With tabu_tenure > 0 the best non-tabu move is applied even if it worsens the
+    score, and the cells changed by a move may not be filled again for tabu_tenure steps unless that
+    would beat the best timetable found so far.
+    """
+    def __init__(self, ga, steps: int = 20, neighbourhood: int = 30, tabu_tenure: int = 0):
+        self.ga = ga
+        self.steps = steps
+        self.neighbourhood = neighbourhood
+        self.tabu_tenure = tabu_tenure
+        self.groups_by_id: Dict[str, Group] = {group.group_id: group for group in ga.groups}
+        self.evaluations = 0
+
+    def improve(self, timetable: Timetable, fitness: float) -> Tuple[Timetable, float]:
+        """
+        Returns the best timetable reached from the given one and its fitness.
+        The input timetable is not modified; if nothing better is found it is returned as is.
+        """
+        current = timetable.derive()
+        breakdown = self.ga.breakdown(timetable).copy()
+        best, best_fitness = timetable, fitness
+        tabu: Dict[Tuple[str, Tuple[int, int]], int] = {}
+
+        for step in range(self.steps):
+            if not current.schedule:
+                break
+            chosen: Optional[Tuple[float, List[Change]]] = None
+            keys = list(current.schedule.keys())
+            for _ in range(self.neighbourhood):
+                changes = self._random_move(current, random.choice(keys))
+                if changes is None:
+                    continue
+                candidate_fitness = self.ga.delta_evaluator.delta_fitness(breakdown, changes)
+                self.evaluations += 1
+                if self._is_tabu(tabu, step, changes) and candidate_fitness <= best_fitness:
+                    continue
+                if chosen is None or candidate_fitness > chosen[0]:
+                    chosen = (candidate_fitness, changes)
+
+            if chosen is None or (self.tabu_tenure == 0 and chosen[0] <= breakdown.fitness):
+                break
+            candidate_fitness, changes = chosen
+            for key, _, _ in changes:
+                tabu[key] = step + self.tabu_tenure
+            for key, old, new in changes:
+                if new is None:
+                    del current.schedule[key]
+            for key, old, new in changes:
+                if new is not None:
+                    current.schedule[key] = new
+            self.ga.delta_evaluator.apply_changes(breakdown, changes)
+
+            if candidate_fitness > best_fitness:
+                best_fitness = candidate_fitness
+                best = current.derive() if self.tabu_tenure else current
+        return best, best_fitness
+
+    def _random_move(self, timetable: Timetable, key: Tuple[str, Tuple[int, int]]) -> Optional[List[Change]]:
+        group_id, slot = key
+        assignment = timetable.schedule[key]
+        kind = random.randrange(4)
+        if kind == 0:
+            return [(key, assignment, None)]
+        free_slots = [other for other in self.ga.time_slots if (group_id, other) not in timetable.schedule]
+        if kind == 1 and free_slots:
+            return self._move(timetable, key, assignment, random.choice(free_slots))
+        if kind == 2 and free_slots:
+            return self._insert(timetable, self.groups_by_id[group_id], random.choice(free_slots))
+        lessons = [other for other in self.ga.time_slots if other != slot and (group_id, other) in timetable.schedule]
+        if kind == 3 and lessons:
+            return self._swap(timetable, key, (group_id, random.choice(lessons)))
+        return None
+
+    def _insert(self, timetable: Timetable, group: Group, slot: Tuple[int, int]) -> Optional[List[Change]]:
+        """
+        Adds a random session of one of the group's subjects at a free slot of the group.
+        """
+        subject_name = random.choice(group.subjects)
+        session_types = self.ga.index.session_types[subject_name]
+        if not session_types:
+            return None
+        session_type = random.choice(session_types)
+        lecturer = next((l for l in self.ga.index.lecturers_for(subject_name, session_type)
+                         if (l.name, slot) not in timetable.lecturer_slots), None)
+        room = next((r for r in self.ga.index.rooms_for(group) if (r.room_id, slot) not in timetable.room_slots), None)
+        if lecturer is None or room is None:
+            return None
+        return [((group.group_id, slot), None, (self.ga.subjects_dict[subject_name], lecturer, room, session_type))]
+
+    def _move(self, timetable: Timetable, key, assignment, new_slot: Tuple[int, int]) -> Optional[List[Change]]:
+        """
+        Relocates a lesson to a free slot of its group, keeping its lecturer and room when they are free there
+        and otherwise taking the first free qualified lecturer and best-fit room.
+        """
+        group = self.groups_by_id[key[0]]
+        subject, lecturer, room, session_type = assignment
+        lecturers = [lecturer] + self.ga.index.lecturers_for(subject.name, session_type)
+        rooms = [room] + self.ga.index.rooms_for(group)
+        free_lecturer = next((l for l in lecturers if (l.name, new_slot) not in timetable.lecturer_slots), None)
+        free_room = next((r for r in rooms if (r.room_id, new_slot) not in timetable.room_slots), None)
+        if free_lecturer is None or free_room is None:
+            return None
+        return [(key, assignment, None), ((group.group_id, new_slot), None, (subject, free_lecturer, free_room, session_type))]
+
+    def _swap(self, timetable: Timetable, first_key, second_key) -> Optional[List[Change]]:
+        """
+        Exchanges the slots of two lessons of the same group if their lecturers and rooms are free at the other slot.
+        """
+        first, second = timetable.schedule[first_key], timetable.schedule[second_key]
+        first_slot, second_slot = first_key[1], second_key[1]
+        for moving, staying, target in ((first, second, second_slot), (second, first, first_slot)):
+            _, lecturer, room, _ = moving
+            _, other_lecturer, other_room, _ = staying
+            if timetable.lecturer_slots.get((lecturer.name, target), 0) - (lecturer.name == other_lecturer.name) > 0:
+                return None
+            if timetable.room_slots.get((room.room_id, target), 0) - (room.room_id == other_room.room_id) > 0:
+                return None
+        return [(first_key, first, second), (second_key, second, first)]
+
+    def _is_tabu(self, tabu: Dict[Tuple[str, Tuple[int, int]], int], step: int, changes: List[Change]) -> bool:
+        return any(new is not None and tabu.get(key, -1) >= step for key, _, new in changes)
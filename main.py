@@ -1,11 +1,24 @@
 # main.py
 
+import argparse
 from models import Timetable, Group, Subject, Lecturer, Room
-from utils import load_data, schedule_to_csv, save_schedule_to_excel
+from utils import load_data, load_grid, schedule_to_csv, save_schedule_to_excel
 from genetic_algorithm import GeneticAlgorithm
+from instrumentation import ConsoleInstrumentation
+from checkpoint import load_checkpoint, warm_start, Checkpointer
 
 def main() -> None:
-    groups, subjects_list, lecturers, rooms = load_data()
+    parser = argparse.ArgumentParser(description="Builds a university timetable with a genetic algorithm.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--checkpoint", help="save a checkpoint to this file every --checkpoint-interval generations")
+    parser.add_argument("--checkpoint-interval", type=int, default=50)
+    parser.add_argument("--resume", help="continue from a checkpoint file")
+    parser.add_argument("--warm-start", help="re-plan a schedule exported by schedule_to_csv for the current data")
+    parser.add_argument("--patience", type=int, help="stop after this many generations without improvement")
+    args = parser.parse_args()
+
+    groups, subjects_list, lecturers, rooms = load_data(args.data_dir)
+    grid = load_grid(args.data_dir)
 
     population_size = 50
     generations = 1000
@@ -20,14 +33,23 @@ def main() -> None:
         population_size=population_size,
         generations=generations,
         mutation_rate=mutation_rate,
-        crossover_pairs=crossover_pairs
+        crossover_pairs=crossover_pairs,
+        instrumentation=ConsoleInstrumentation(),
+        grid=grid
     )
 
-    ga.create_population()
+    if args.resume:
+        load_checkpoint(ga, args.resume)
+    elif args.warm_start:
+        report = warm_start(ga, args.warm_start)
+        print(f"Warm start: {report['kept']} lessons kept, {report['replaced']} replaced, {report['dropped']} dropped")
+    else:
+        ga.create_population()
 
-    best_timetable = ga.run()
+    callback = Checkpointer(ga, args.checkpoint, args.checkpoint_interval) if args.checkpoint else None
+    best_timetable = ga.run(patience=args.patience, callback=callback)
 
-    save_schedule_to_excel(best_timetable, output_folder="schedules")
+    save_schedule_to_excel(best_timetable, output_folder="schedules", grid=grid)
     print("Schedules saved to Excel files in the 'schedules' folder.")
 
     best_fitness = ga.calculate_individual_fitness(best_timetable)
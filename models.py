@@ -1,4 +1,6 @@
-from typing import List, Dict, Tuple
+import random
+from collections.abc import Mapping, MutableMapping
+from typing import List, Dict, Tuple, Optional
 
 class Group:
     def __init__(self, group_id: str, size: int, subjects: List[str]):
@@ -35,9 +37,500 @@ class Room:
     def __repr__(self) -> str:
         return f"Room(id={self.room_id}, capacity={self.capacity})"
 
+Slot = Tuple[int, int]
+Assignment = Tuple[Subject, Lecturer, Room, str]
+
+# Marks a lesson removed in an overlay layer while it still exists in a shared layer below.
+_DELETED = object()
+
+class _Layer:
+    """
+    One level of a timetable's storage: schedule entries and lecturer/room slot counts.
+    A layer without a parent holds complete data. A layer with a parent holds only the differences
+    from it; a removed lesson is stored as _DELETED and a freed slot as a zero count.
+    Once derive() has shared a layer it is never written again; its owner puts a new overlay on top first.
+    """
+    __slots__ = ('schedule', 'lecturer_slots', 'room_slots', 'parent', 'depth', 'shared', '_keys')
+
+    def __init__(self, parent: Optional["_Layer"] = None):
+        self.schedule: Dict[Tuple[str, Slot], object] = {}
+        self.lecturer_slots: Dict[Tuple[str, Slot], int] = {}
+        self.room_slots: Dict[Tuple[str, Slot], int] = {}
+        self.parent = parent
+        self.depth: int = parent.depth + 1 if parent is not None else 0
+        self.shared: bool = False
+        self._keys: Optional[List[Tuple[str, Slot]]] = None
+
+    def key_list(self) -> List[Tuple[str, Slot]]:
+        """
+        Returns the keys of the layer's schedule entries, removals included, as a list.
+        The list is kept once the layer is shared, as it can no longer change; it must only be read.
+        """
+        if not self.shared:
+            return list(self.schedule)
+        if self._keys is None:
+            self._keys = list(self.schedule)
+        return self._keys
+
+    def is_empty(self) -> bool:
+        return not (self.schedule or self.lecturer_slots or self.room_slots)
+
+    def chain(self) -> List["_Layer"]:
+        """
+        Returns the layers from the bottom (complete) one up to this one.
+        """
+        layers = []
+        layer = self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer.parent
+        layers.reverse()
+        return layers
+
+    def flatten(self) -> "_Layer":
+        """
+        Returns a parentless layer holding the combined contents of this layer's chain.
+        """
+        flat = _Layer()
+        flat.schedule = self.merged('schedule')
+        flat.lecturer_slots = self.merged('lecturer_slots')
+        flat.room_slots = self.merged('room_slots')
+        return flat
+
+    def merged(self, field: str) -> Dict:
+        """
+        Returns a new dict with the combined contents of one field over this layer's chain.
+        """
+        chain = self.chain()
+        merged = dict(getattr(chain[0], field))
+        for layer in chain[1:]:
+            for key, value in getattr(layer, field).items():
+                if value is _DELETED or value == 0:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+        return merged
+
+class SlotCounts(Mapping):
+    """
+    Read-only view of a timetable's lesson counts per (lecturer name or room id, slot).
+    Slots without lessons are absent, so "(name, slot) in counts" means the slot is taken.
+    Iterating over the counts of an overlay timetable compacts it first.
+    """
+    def __init__(self, timetable: "Timetable", field: str):
+        self._timetable = timetable
+        self._field = field
+
+    def __getitem__(self, key: Tuple[str, Slot]) -> int:
+        layer = self._timetable._layer
+        while layer is not None:
+            counts = getattr(layer, self._field)
+            if key in counts:
+                count = counts[key]
+                if count:
+                    return count
+                raise KeyError(key)
+            layer = layer.parent
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        layer = self._timetable._layer
+        if layer.parent is None:
+            # A flat layer holds no zero counts.
+            return key in getattr(layer, self._field)
+        while layer is not None:
+            counts = getattr(layer, self._field)
+            if key in counts:
+                return counts[key] > 0
+            layer = layer.parent
+        return False
+
+    def get(self, key: Tuple[str, Slot], default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _flat(self) -> Dict[Tuple[str, Slot], int]:
+        return getattr(self._timetable._flat_layer(), self._field)
+
+    def __iter__(self):
+        return iter(self._flat())
+
+    def __len__(self) -> int:
+        return len(self._flat())
+
+    def items(self):
+        return self._flat().items()
+
+
+class Schedule(MutableMapping):
+    """
+    The (group_id, slot) -> (subject, lecturer, room, session_type) mapping of a Timetable.
+    Every insert and removal is reported to the owning timetable so that its occupancy index stays current.
+    Lookups see through the timetable's overlay layers and writes go to its own top layer only.
+    Iterating over the schedule of an overlay timetable compacts it first, so no merged copy is kept
+    next to the layers.
+    """
+    def __init__(self, timetable: "Timetable"):
+        self._timetable = timetable
+
+    def __getitem__(self, key: Tuple[str, Slot]) -> Assignment:
+        assignment = self.get(key)
+        if assignment is None:
+            raise KeyError(key)
+        return assignment
+
+    def __contains__(self, key) -> bool:
+        layer = self._timetable._layer
+        if layer.parent is None:
+            return key in layer.schedule
+        while layer is not None:
+            assignment = layer.schedule.get(key)
+            if assignment is not None:
+                return assignment is not _DELETED
+            layer = layer.parent
+        return False
+
+    def get(self, key: Tuple[str, Slot], default: Optional[Assignment] = None) -> Optional[Assignment]:
+        layer = self._timetable._layer
+        while layer is not None:
+            assignment = layer.schedule.get(key)
+            if assignment is not None:
+                return default if assignment is _DELETED else assignment
+            layer = layer.parent
+        return default
+
+    def __setitem__(self, key: Tuple[str, Slot], assignment: Assignment) -> None:
+        timetable = self._timetable
+        layer = timetable._own_layer()
+        old = layer.schedule.get(key) if layer.parent is None else self.get(key)
+        if old is not None:
+            timetable._release(layer, key, old)
+        else:
+            timetable._size += 1
+        layer.schedule[key] = assignment
+        timetable._occupy(layer, key, assignment)
+
+    def __delitem__(self, key: Tuple[str, Slot]) -> None:
+        timetable = self._timetable
+        assignment = self[key]
+        layer = timetable._own_layer()
+        if layer.parent is None:
+            del layer.schedule[key]
+        else:
+            layer.schedule[key] = _DELETED
+        timetable._size -= 1
+        timetable._release(layer, key, assignment)
+
+    def random_key(self) -> Tuple[str, Slot]:
+        """
+        Returns a key drawn uniformly at random, without compacting an overlay timetable: a key is drawn
+        from all layers' entries and drawn again if it is removed or overridden in a layer above.
+        On a flat timetable this draws the same key as random.choice(list(schedule)).
+        Raises IndexError if the schedule is empty.
+        """
+        timetable = self._timetable
+        if not timetable._size:
+            raise IndexError("Cannot choose from an empty schedule")
+        layer = timetable._layer
+        if layer.parent is None:
+            return random.choice(layer.key_list())
+        chain = layer.chain()
+        key_lists = [level.key_list() for level in chain]
+        total = sum(len(keys) for keys in key_lists)
+        while True:
+            index = random.randrange(total)
+            for depth, keys in enumerate(key_lists):
+                if index < len(keys):
+                    break
+                index -= len(keys)
+            key = keys[index]
+            if chain[depth].schedule[key] is not _DELETED and all(key not in above.schedule for above in chain[depth + 1:]):
+                return key
+
+    def _flat(self) -> Dict[Tuple[str, Slot], Assignment]:
+        return self._timetable._flat_layer().schedule
+
+    def __iter__(self):
+        return iter(self._flat())
+
+    def __len__(self) -> int:
+        return self._timetable._size
+
+    def keys(self):
+        return self._flat().keys()
+
+    def items(self):
+        return self._flat().items()
+
+    def values(self):
+        return self._flat().values()
+
+    def clear(self) -> None:
+        self._timetable._reset()
+
+    def copy(self) -> Dict[Tuple[str, Slot], Assignment]:
+        return dict(self._flat())
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
 class Timetable:
+    """
+    A group-by-slot schedule together with its occupancy index.
+    The schedule keys double as the group-by-slot occupancy; lecturer_slots and room_slots count
+    the lessons of each lecturer (by name) and room (by id) per slot, and conflicts is the number
+    of hard-constraint clashes, the value utils.check_constraints reports.
+    All of them are kept up to date on every insert and pop, so checks cost O(1).
+
+    derive() makes a copy-on-write child that shares its parent's data and stores only its own
+    changes on top. The parent stays as it is until it is written again. A child is compacted into
+    a flat timetable when its whole schedule is read, or when its chain gets deeper than max_depth.
+
+    pack() swaps all of this for the timetable's dense encoding, which is decoded again on the first
+    read or write; only the size, conflicts and fingerprint stay at hand without decoding.
+    """
+    max_depth: int = 8
+
     def __init__(self):
-        self.schedule: Dict[Tuple[str, Tuple[int, int]], Tuple[Subject, Lecturer, Room, str]] = {}
+        self._layer = _Layer()
+        self._size: int = 0
+        self._schedule: Schedule = Schedule(self)
+        self.lecturer_slots: SlotCounts = SlotCounts(self, 'lecturer_slots')
+        self.room_slots: SlotCounts = SlotCounts(self, 'room_slots')
+        self.conflicts: int = 0
+        self._fingerprint: int = 0
+
+    @property
+    def schedule(self) -> Schedule:
+        return self._schedule
+
+    @schedule.setter
+    def schedule(self, schedule: Dict[Tuple[str, Slot], Assignment]) -> None:
+        """
+        Replaces the whole schedule, building a flat layer and its index in one pass.
+        """
+        self._layer, self.conflicts = _index_layer(schedule)
+        self._size = len(self._layer.schedule)
+        fingerprint = 0
+        for key, assignment in self._layer.schedule.items():
+            fingerprint += _cell_hash(key, assignment)
+        self._fingerprint = fingerprint & _HASH_MASK
+
+    def copy(self) -> "Timetable":
+        """
+        Returns an independent flat copy, duplicating the index instead of rebuilding it.
+        """
+        timetable = self._sibling()
+        timetable._layer = self._layer.flatten()
+        return timetable
+
+    def derive(self) -> "Timetable":
+        """
+        Returns a copy-on-write child: it shares this timetable's current data and records only its
+        own changes. Both keep working independently; neither sees the other's later changes.
+        """
+        shared = self._layer
+        while shared.parent is not None and shared.is_empty():
+            shared = shared.parent
+        if shared.depth >= self.max_depth:
+            shared = shared.flatten()
+        self._layer = shared
+        shared.shared = True
+        timetable = self._sibling()
+        timetable._layer = _Layer(shared)
+        return timetable
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of overlay layers above the flat data; 0 for a flat timetable.
+        """
+        return self._layer.depth
+
+    def compact(self) -> None:
+        """
+        Flattens the overlay chain into a private flat copy, releasing references to shared layers.
+        Overlays without changes are dropped instead, leaving the timetable on the flat layer below.
+        """
+        layer = self._layer
+        while layer.parent is not None and layer.is_empty():
+            layer = layer.parent
+        if layer.parent is not None:
+            layer = layer.flatten()
+        self._layer = layer
+
+    def pack(self, encoder) -> None:
+        """
+        Releases the dict storage, keeping only the timetable's EncodedTimetable from the given
+        TimetableEncoder until the timetable is next used. An encoding kept for the same contents
+        is reused instead of encoding the timetable again.
+        """
+        if self.packed:
+            return
+        if self.encoding(encoder) is None:
+            self.keep_encoding(encoder, encoder.encode(self))
+        del self._layer
+
+    @property
+    def packed(self) -> bool:
+        return '_layer' not in self.__dict__
+
+    def keep_encoding(self, encoder, encoded) -> None:
+        """
+        Remembers encoded as the timetable's encoding by encoder, which encoding() returns until the
+        timetable changes. The cells must not be changed afterwards.
+        """
+        self._encoding = (encoder, self._fingerprint, encoded)
+
+    def encoding(self, encoder):
+        """
+        Returns the kept EncodedTimetable if it was made by this encoder and the timetable has not
+        changed since, otherwise None. The returned encoding must only be read.
+        """
+        kept = self.__dict__.get('_encoding')
+        if kept is None or kept[0] is not encoder or kept[1] != self._fingerprint:
+            return None
+        return kept[2]
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes the instance lacks: the storage of a packed timetable,
+        # which is decoded here on first use. Size, conflicts and fingerprint were kept.
+        if name == '_layer' and '_encoding' in self.__dict__:
+            encoder, _, encoded = self.__dict__['_encoding']
+            self._layer = _index_layer(encoder.lessons(encoded))[0]
+            return self._layer
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def is_free(self, group_id: str, slot: Slot, lecturer: Lecturer, room: Room) -> bool:
+        """
+        Checks in O(1) that the group, lecturer and room are all free at the slot.
+        """
+        layer = self._layer
+        if layer.parent is None:
+            return (
+                (group_id, slot) not in layer.schedule
+                and (lecturer.name, slot) not in layer.lecturer_slots
+                and (room.room_id, slot) not in layer.room_slots
+            )
+        return (
+            (group_id, slot) not in self._schedule
+            and (lecturer.name, slot) not in self.lecturer_slots
+            and (room.room_id, slot) not in self.room_slots
+        )
+
+    def fingerprint(self) -> int:
+        """
+        Order-independent hash of the timetable contents, used as the fitness cache key.
+        Maintained incrementally, so it costs O(1).
+        """
+        return self._fingerprint
+
+    def _sibling(self) -> "Timetable":
+        timetable = Timetable()
+        timetable._size = self._size
+        timetable.conflicts = self.conflicts
+        timetable._fingerprint = self._fingerprint
+        return timetable
+
+    def _own_layer(self) -> _Layer:
+        """
+        Returns the top layer for writing, first putting a new overlay over it if it has been shared.
+        """
+        layer = self._layer
+        if layer.shared:
+            layer = self._layer = _Layer(layer)
+        return layer
+
+    def _flat_layer(self) -> _Layer:
+        """
+        Returns the single layer holding the whole timetable, compacting an overlay timetable first.
+        The returned layer must only be read.
+        """
+        if self._layer.parent is not None:
+            self.compact()
+        return self._layer
+
+    def _occupy(self, layer: _Layer, key: Tuple[str, Slot], assignment: Assignment) -> None:
+        _, slot = key
+        _, lecturer, room, _ = assignment
+        self.conflicts += (
+            _add_lesson(layer, 'lecturer_slots', (lecturer.name, slot), 1)
+            + _add_lesson(layer, 'room_slots', (room.room_id, slot), 1)
+        )
+        self._fingerprint = (self._fingerprint + _cell_hash(key, assignment)) & _HASH_MASK
+
+    def _release(self, layer: _Layer, key: Tuple[str, Slot], assignment: Assignment) -> None:
+        _, slot = key
+        _, lecturer, room, _ = assignment
+        self.conflicts -= (
+            _add_lesson(layer, 'lecturer_slots', (lecturer.name, slot), -1)
+            + _add_lesson(layer, 'room_slots', (room.room_id, slot), -1)
+        )
+        self._fingerprint = (self._fingerprint - _cell_hash(key, assignment)) & _HASH_MASK
+
+    def _reset(self) -> None:
+        self._layer = _Layer()
+        self._size = 0
+        self.conflicts = 0
+        self._fingerprint = 0
+
+    def __getstate__(self) -> Dict:
+        return {"schedule": self._schedule.copy()}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__()
+        self.schedule = state["schedule"]
 
     def __repr__(self) -> str:
-        return f"Timetable(schedule={self.schedule})"
+        return f"Timetable(schedule={self._schedule.copy()})"
+
+_HASH_MASK = (1 << 64) - 1
+
+def _index_layer(schedule: Dict[Tuple[str, Slot], Assignment]) -> Tuple[_Layer, int]:
+    """
+    Returns a flat layer holding the schedule and its slot counts, and the number of clashes.
+    """
+    layer = _Layer()
+    lessons, lecturer_slots, room_slots = layer.schedule, layer.lecturer_slots, layer.room_slots
+    for key, assignment in schedule.items():
+        _, slot = key
+        _, lecturer, room, _ = assignment
+        lessons[key] = assignment
+        lecturer_key = (lecturer.name, slot)
+        lecturer_slots[lecturer_key] = lecturer_slots.get(lecturer_key, 0) + 1
+        room_key = (room.room_id, slot)
+        room_slots[room_key] = room_slots.get(room_key, 0) + 1
+    conflicts = sum(count - 1 for count in lecturer_slots.values()) + sum(count - 1 for count in room_slots.values())
+    return layer, conflicts
+
+def _add_lesson(layer: _Layer, field: str, key: Tuple[str, Slot], step: int) -> int:
+    """
+    Adds step (+1 or -1) to a slot count in the given top layer and returns 1 if the slot
+    holds another lesson besides the one added or removed, i.e. the change affects a clash.
+    """
+    counts = getattr(layer, field)
+    count = counts.get(key)
+    if count is None:
+        count = 0
+        below = layer.parent
+        while below is not None:
+            below_counts = getattr(below, field)
+            if key in below_counts:
+                count = below_counts[key]
+                break
+            below = below.parent
+    new_count = count + step
+    if new_count or layer.parent is not None:
+        counts[key] = new_count
+    else:
+        del counts[key]
+    return 1 if count > 0 and new_count > 0 else 0
+
+def _cell_hash(key: Tuple[str, Slot], assignment: Assignment) -> int:
+    subject, lecturer, room, session_type = assignment
+    return hash((key, subject.name, lecturer.lecturer_id, room.room_id, session_type))
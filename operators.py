@@ -0,0 +1,60 @@
+import random
+from typing import List, Dict, Optional
+
+class OperatorScheduler:
+    """
+    Adaptive operator selection by probability matching.
+    Every application of an operator is recorded with the fitness gain of the child over its parent
+    (None when the operator produced no valid child). Each operator keeps a quality estimate, an
+    exponential moving average of its rewards, where the reward is the positive gain scaled by the
+    largest gain seen so far. Operators are then drawn with probability
+        min_probability + (1 - K * min_probability) * quality / total quality
+    so the evaluations go to the operators that pay off while none is starved completely.
+    """
+    def __init__(self, names: List[str], min_probability: float = 0.05, adaptation_rate: float = 0.2):
+        self.names = list(names)
+        self.min_probability = min_probability
+        self.adaptation_rate = adaptation_rate
+        self.quality: Dict[str, float] = {name: 1.0 for name in self.names}
+        self.applications: Dict[str, int] = {name: 0 for name in self.names}
+        self.valid: Dict[str, int] = {name: 0 for name in self.names}
+        self.successes: Dict[str, int] = {name: 0 for name in self.names}
+        self.total_gain: Dict[str, float] = {name: 0.0 for name in self.names}
+        self._largest_gain = 0.0
+
+    def probabilities(self) -> Dict[str, float]:
+        total = sum(self.quality.values())
+        if total <= 0:
+            return {name: 1 / len(self.names) for name in self.names}
+        spread = 1 - len(self.names) * self.min_probability
+        return {name: self.min_probability + spread * self.quality[name] / total for name in self.names}
+
+    def choose(self) -> str:
+        probabilities = self.probabilities()
+        return random.choices(self.names, weights=[probabilities[name] for name in self.names])[0]
+
+    def record(self, name: str, gain: Optional[float]) -> None:
+        self.applications[name] += 1
+        reward = 0.0
+        if gain is not None:
+            self.valid[name] += 1
+        if gain is not None and gain > 0:
+            self.successes[name] += 1
+            self.total_gain[name] += gain
+            self._largest_gain = max(self._largest_gain, gain)
+            reward = gain / self._largest_gain
+        self.quality[name] += self.adaptation_rate * (reward - self.quality[name])
+
+    def success_rate(self, name: str) -> float:
+        return self.successes[name] / self.applications[name] if self.applications[name] else 0.0
+
+    def summary(self) -> str:
+        probabilities = self.probabilities()
+        return ", ".join(
+            f"{name}: {self.applications[name]} applied, {self.success_rate(name):.1%} improved, "
+            f"gain {self.total_gain[name]:.0f}, p={probabilities[name]:.2f}"
+            for name in self.names
+        )
+
+    def __repr__(self) -> str:
+        return f"OperatorScheduler({self.summary()})"
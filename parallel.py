@@ -0,0 +1,87 @@
+import random
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from models import Timetable, Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Optional
+from encoding import EncodedTimetable
+
+# Per-process GeneticAlgorithm, built once by _init_worker from the instance data.
+_worker_ga = None
+
+def _init_worker(
+    ga_class: type,
+    groups: List[Group],
+    subjects: List[Subject],
+    lecturers: List[Lecturer],
+    rooms: List[Room],
+    options: Dict
+) -> None:
+    global _worker_ga
+    with warnings.catch_warnings():
+        # The parent process has already warned about the instance.
+        warnings.simplefilter("ignore")
+        _worker_ga = ga_class(groups, subjects, lecturers, rooms, **options)
+
+def build_seeded(ga, seed: int, mode: Optional[str]) -> Timetable:
+    """
+    Reseeds the random module with seed and builds one new individual for ga: 'constructive' with
+    ConstructiveBuilder.build, 'random' with generate_valid_schedule and None with new_schedule,
+    which follows the seeding mode.
+    """
+    random.seed(seed)
+    if mode == 'constructive':
+        return ga.builder.build()
+    if mode == 'random':
+        return ga.generate_valid_schedule()
+    return ga.new_schedule()
+
+def _build(task: Tuple[int, Optional[str]]) -> np.ndarray:
+    seed, mode = task
+    return _worker_ga.encoder.encode(build_seeded(_worker_ga, seed, mode)).cells
+
+class ParallelBuilder:
+    """
+    Builds new individuals for a GeneticAlgorithm on a process pool.
+    Making a valid timetable from scratch is by far the costliest operation of a run on a large
+    instance, and each one is independent of the others, so they are built in parallel.
+    The instance data reaches each worker once, through the pool initializer, where it builds its own
+    GeneticAlgorithm; afterwards only a seed goes out per individual and its encoded cells come back.
+    Each individual is made by build_seeded from its own seed, which GeneticAlgorithm.create_population
+    also uses when it builds serially, so a seeded run gets the same population with any number of workers.
+    The speedup has only been measured on a single core, where the pool adds its start-up and transfer
+    cost and nothing else; benchmark.py --workers records it together with the machine's core count.
+    """
+    def __init__(self, ga, workers: int):
+        self.encoder = ga.encoder
+        self.workers = workers
+        options = {
+            'seeding': ga.seeding,
+            'constructive_ratio': ga.constructive_ratio,
+            'grid': ga.grid,
+        }
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(type(ga), ga.groups, ga.subjects, ga.lecturers, ga.rooms, options)
+        )
+
+    def build(self, seeds: List[int], modes: List[Optional[str]]) -> List[Timetable]:
+        """
+        Returns one new timetable per (seed, mode) pair, built as build_seeded builds it.
+        """
+        tasks = list(zip(seeds, modes))
+        chunksize = max(1, len(tasks) // (4 * self.workers))
+        return [
+            self.encoder.decode(EncodedTimetable(cells))
+            for cells in self._executor.map(_build, tasks, chunksize=chunksize)
+        ]
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self) -> "ParallelBuilder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
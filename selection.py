@@ -0,0 +1,40 @@
+import heapq
+import random
+from typing import List, Dict, Callable
+
+def truncation_selection(scores: List[float], count: int) -> List[int]:
+    """
+    Returns the indices of the count highest scores, best first, without sorting the whole list.
+    """
+    return heapq.nlargest(count, range(len(scores)), key=scores.__getitem__)
+
+def tournament_selection(scores: List[float], count: int, tournament_size: int = 3) -> List[int]:
+    """
+    Picks count distinct indices, each the winner of a tournament among tournament_size
+    random candidates that have not been picked yet.
+    """
+    candidates = list(range(len(scores)))
+    chosen = []
+    for _ in range(min(count, len(candidates))):
+        entrants = random.sample(range(len(candidates)), min(tournament_size, len(candidates)))
+        winner = max(entrants, key=lambda position: scores[candidates[position]])
+        chosen.append(candidates[winner])
+        candidates[winner] = candidates[-1]
+        candidates.pop()
+    return chosen
+
+def rank_selection(scores: List[float], count: int) -> List[int]:
+    """
+    Picks count distinct indices with probability proportional to their rank (worst has rank 1),
+    so the selection pressure does not depend on the scale of the fitness values.
+    Uses Efraimidis-Spirakis keys, u ** (1 / weight), to sample without replacement in one pass.
+    """
+    order = sorted(range(len(scores)), key=scores.__getitem__)
+    keys = {index: random.random() ** (1 / rank) for rank, index in enumerate(order, start=1)}
+    return heapq.nlargest(count, keys, key=keys.__getitem__)
+
+SELECTION_METHODS: Dict[str, Callable[..., List[int]]] = {
+    'truncation': truncation_selection,
+    'tournament': tournament_selection,
+    'rank': rank_selection,
+}
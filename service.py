@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor, Future
+from models import Group, Subject, Lecturer, Room
+from typing import List, Dict, Tuple, Optional
+from genetic_algorithm import GeneticAlgorithm, GenerationStats, SEEDING_MODES
+from selection import SELECTION_METHODS
+from utils import validate_instance, write_schedule_csv
+from timegrid import TimeGrid
+
+# GeneticAlgorithm keyword arguments a job may set, besides the run() limits below.
+GA_OPTIONS = (
+    'population_size', 'generations', 'mutation_rate', 'crossover_pairs', 'local_search_top_k',
+    'local_search_steps', 'local_search_neighbourhood', 'tabu_tenure', 'seeding', 'constructive_ratio',
+    'selection', 'elite_count', 'mutation_count', 'tournament_size', 'adaptive_operators', 'pack_population',
+)
+RUN_OPTIONS = ('time_budget', 'target_fitness', 'patience')
+# Expected type of each option; options whose default is None may also be null.
+OPTION_TYPES = {
+    'population_size': int, 'generations': int, 'mutation_rate': float, 'crossover_pairs': int,
+    'local_search_top_k': int, 'local_search_steps': int, 'local_search_neighbourhood': int, 'tabu_tenure': int,
+    'seeding': str, 'constructive_ratio': float, 'selection': str, 'elite_count': int, 'mutation_count': int,
+    'tournament_size': int, 'adaptive_operators': bool, 'pack_population': bool,
+    'time_budget': float, 'target_fitness': float, 'patience': int,
+}
+NULLABLE_OPTIONS = ('mutation_count', 'time_budget', 'target_fitness', 'patience')
+
+def instance_from_payload(payload: Dict) -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]:
+    """
+    Builds an instance from a job payload with "groups", "subjects", "lecturers" and "rooms" lists.
+    Their fields follow the CSV columns, except that a lecturer's qualifications are given as
+    "subjects": {subject name: [session types]}. Raises ValueError for malformed or invalid instances.
+    """
+    try:
+        subjects = [Subject(s["name"], int(s["lecture_hours"]), int(s["practice_hours"])) for s in payload["subjects"]]
+        groups = [Group(g["group_id"], int(g["size"]), list(g["subjects"])) for g in payload["groups"]]
+        lecturers = []
+        for entry in payload["lecturers"]:
+            lecturer = Lecturer(entry["lecturer_id"], entry["name"])
+            lecturer.subjects = {name: list(types) for name, types in entry["subjects"].items()}
+            lecturers.append(lecturer)
+        rooms = [Room(r["room_id"], int(r["capacity"])) for r in payload["rooms"]]
+    except (KeyError, TypeError, AttributeError) as error:
+        raise ValueError(f"Malformed instance payload: {error!r}")
+    validate_instance(groups, subjects, lecturers, rooms)
+    return groups, subjects, lecturers, rooms
+
+def grid_from_payload(payload: Dict) -> TimeGrid:
+    """
+    Builds the time grid from the payload's optional "grid": {"days", "periods", "weeks"} object.
+    """
+    try:
+        return TimeGrid(**payload.get("grid", {}))
+    except TypeError as error:
+        raise ValueError(f"Malformed grid: {error}")
+
+def options_from_payload(payload: Dict) -> Tuple[Dict, Dict]:
+    """
+    Checks the payload's optional "options" object and splits it into GeneticAlgorithm and run()
+    keyword arguments; "seed" is left to the caller. Raises ValueError for unknown options, values of
+    the wrong type, negative counts, ratios outside [0, 1] and unknown seeding or selection methods,
+    so that a bad job is refused when it is submitted instead of failing in a worker.
+    """
+    options = payload.get("options", {})
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object")
+    unknown = sorted(name for name in options if name not in OPTION_TYPES and name != "seed")
+    if unknown:
+        raise ValueError("Unknown options " + ", ".join(unknown))
+    seed = options.get("seed")
+    if seed is not None and not isinstance(seed, (int, float, str)):
+        raise ValueError(f"Invalid seed {seed!r}")
+    invalid = []
+    for name, value in options.items():
+        if name == "seed" or (value is None and name in NULLABLE_OPTIONS):
+            continue
+        kind = OPTION_TYPES[name]
+        if kind is bool:
+            valid = isinstance(value, bool)
+        elif kind is str:
+            valid = value in (SEEDING_MODES if name == "seeding" else SELECTION_METHODS)
+        elif isinstance(value, bool) or not isinstance(value, int if kind is int else (int, float)):
+            valid = False
+        elif name in ('mutation_rate', 'constructive_ratio'):
+            valid = 0 <= value <= 1
+        elif name == 'target_fitness':
+            valid = math.isfinite(value)
+        else:
+            valid = value >= (1 if name in ('population_size', 'tournament_size', 'patience') else 0)
+        if not valid:
+            invalid.append(f"{name}={value!r}")
+    if invalid:
+        raise ValueError("Invalid options " + ", ".join(invalid))
+    return (
+        {name: options[name] for name in GA_OPTIONS if name in options},
+        {name: options[name] for name in RUN_OPTIONS if name in options},
+    )
+
+def _solve(job_id: int, payload: Dict, progress, cancelled) -> Dict:
+    """
+    Runs one job in a worker process. Progress records go to the progress queue as (job id, record),
+    and the run stops at the next generation once cancelled[job_id] is set.
+    """
+    ga_options, run_options = options_from_payload(payload)
+    seed = payload.get("options", {}).get("seed")
+    if seed is not None:
+        random.seed(seed)
+    ga = GeneticAlgorithm(*instance_from_payload(payload), grid=grid_from_payload(payload), **ga_options)
+
+    def report(best, stats: GenerationStats) -> bool:
+        progress.put((job_id, {
+            "generation": stats.generation,
+            "best_fitness": stats.best_fitness,
+            "mean_fitness": stats.mean_fitness,
+            "elapsed": stats.elapsed,
+        }))
+        return cancelled.get(job_id, False)
+
+    # run() builds the population itself, so a time_budget also covers building it.
+    best = ga.run(callback=report, **run_options)
+    schedule = io.StringIO()
+    write_schedule_csv(best, schedule)
+    return {
+        "fitness": ga.best()[1],
+        "generation": ga.generation,
+        "stop_reason": ga.stop_reason,
+        "schedule_csv": schedule.getvalue(),
+    }
+
+class Job:
+    """
+    State of one submitted job as seen by the server: status, progress records and the final result.
+    """
+    def __init__(self, job_id: int, payload: Dict):
+        self.id = job_id
+        self.payload = payload
+        self.status = "queued"
+        self.events: List[Dict] = []
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.changed = asyncio.Event()
+
+    def publish(self, event: Dict) -> None:
+        self.events.append(event)
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def summary(self) -> Dict:
+        latest = self.events[-1] if self.events else {}
+        return {
+            "id": self.id,
+            "status": self.status,
+            "generation": latest.get("generation"),
+            "best_fitness": latest.get("best_fitness"),
+            "fitness": self.result["fitness"] if self.result else None,
+            "stop_reason": self.result["stop_reason"] if self.result else None,
+            "error": self.error,
+        }
+
+class SchedulingService:
+    """
+    Local HTTP job service for timetabling runs, built on asyncio and the standard library only.
+    Jobs run on a process pool of at most workers processes; at most max_jobs unfinished jobs are
+    accepted, further submissions get 503. Endpoints:
+        POST   /jobs                  submit an instance payload (see instance_from_payload) with optional
+                                      "grid" (see grid_from_payload) and "options" (GeneticAlgorithm and
+                                      run() arguments, "seed"; see options_from_payload); returns the job id
+        GET    /jobs                  list jobs
+        GET    /jobs/<id>             job status
+        GET    /jobs/<id>/events      per-generation progress as JSON lines, streamed until the job ends
+        GET    /jobs/<id>/schedule    the best schedule as CSV once the job has ended; a job cancelled while
+                                      running returns the best schedule it had found
+        DELETE /jobs/<id>             cancel: queued jobs are dropped, running jobs stop after their current generation
+    """
+    def __init__(self, workers: int = 2, max_jobs: int = 32):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        # Spawned rather than forked processes, so they inherit neither the listening socket nor helper threads.
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._progress = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Serves until SIGINT or SIGTERM, then cancels the unfinished jobs and shuts the workers down.
+        """
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self._handle, host, port)
+        serving = asyncio.ensure_future(server.serve_forever())
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, serving.cancel)
+        relay = loop.run_in_executor(None, self._relay_progress, loop)
+        try:
+            async with server:
+                await serving
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._progress.put(None)
+            await relay
+            self.close()
+
+    def close(self) -> None:
+        for job in self.jobs.values():
+            self.cancel(job)
+        self._executor.shutdown(cancel_futures=True)
+        self._manager.shutdown()
+
+    def _relay_progress(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Forwards progress records from the worker processes to the jobs, on a helper thread.
+        """
+        while True:
+            message = self._progress.get()
+            if message is None:
+                return
+            job_id, event = message
+            loop.call_soon_threadsafe(self._on_progress, job_id, event)
+
+    def _on_progress(self, job_id: int, event: Dict) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.status = "running"
+            job.publish(event)
+
+    def submit(self, payload: Dict) -> Job:
+        instance_from_payload(payload)
+        grid_from_payload(payload)
+        options_from_payload(payload)
+        if sum(not job.finished for job in self.jobs.values()) >= self.max_jobs:
+            raise OverflowError("Too many unfinished jobs")
+        job = Job(next(self._ids), payload)
+        self.jobs[job.id] = job
+        loop = asyncio.get_running_loop()
+        job.future = self._executor.submit(_solve, job.id, payload, self._progress, self._cancelled)
+        job.future.add_done_callback(lambda future: loop.call_soon_threadsafe(self._on_done, job, future))
+        return job
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        if future.cancelled():
+            job.status = "cancelled"
+        elif future.exception() is not None:
+            job.status, job.error = "failed", repr(future.exception())
+        else:
+            job.result = future.result()
+            job.status = "cancelled" if job.result["stop_reason"] == "callback" else "done"
+        self._cancelled.pop(job.id, None)
+        final = {"status": job.status}
+        if job.result is not None:
+            final.update(generation=job.result["generation"], best_fitness=job.result["fitness"])
+        job.publish(final)
+
+    def cancel(self, job: Job) -> None:
+        """
+        Drops a queued job at once; a running job sees the flag in its next generation callback.
+        """
+        if job.finished:
+            return
+        self._cancelled[job.id] = True
+        job.future.cancel()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path.rstrip("/").split("/")[1:], body, writer)
+        except ValueError as error:
+            self._respond(writer, 400, {"error": str(error)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("Malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return request_line[0].upper(), request_line[1], body
+
+    async def _route(self, method: str, parts: List[str], body: bytes, writer: asyncio.StreamWriter) -> None:
+        if parts == ["jobs"] and method == "POST":
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError as error:
+                raise ValueError(f"Invalid JSON: {error}")
+            try:
+                job = self.submit(payload)
+            except OverflowError as error:
+                self._respond(writer, 503, {"error": str(error)})
+                return
+            self._respond(writer, 202, job.summary())
+            return
+        if parts == ["jobs"] and method == "GET":
+            self._respond(writer, 200, [job.summary() for job in self.jobs.values()])
+            return
+        job = self.jobs.get(int(parts[1])) if len(parts) >= 2 and parts[0] == "jobs" and parts[1].isdigit() else None
+        if job is None:
+            self._respond(writer, 404, {"error": "Not found"})
+        elif len(parts) == 2 and method == "GET":
+            self._respond(writer, 200, job.summary())
+        elif len(parts) == 2 and method == "DELETE":
+            self.cancel(job)
+            self._respond(writer, 202, job.summary())
+        elif parts[2:] == ["events"] and method == "GET":
+            await self._stream_events(job, writer)
+        elif parts[2:] == ["schedule"] and method == "GET":
+            if job.result is None:
+                self._respond(writer, 409, {"error": f"Job is {job.status}"})
+            else:
+                self._respond(writer, 200, job.result["schedule_csv"], content_type="text/csv; charset=utf-8")
+        else:
+            self._respond(writer, 404, {"error": "Not found"})
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        """
+        Sends the job's progress records as JSON lines, without a content length, and closes the
+        connection after the final {"status": ...} record.
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nCache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        sent = 0
+        while True:
+            changed = job.changed
+            for event in job.events[sent:]:
+                writer.write(json.dumps(event).encode() + b"\n")
+            sent = len(job.events)
+            await writer.drain()
+            if job.finished and sent == len(job.events):
+                return
+            await changed.wait()
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, content, content_type: str = "application/json") -> None:
+        reasons = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 503: "Service Unavailable"}
+        body = (content if isinstance(content, str) else json.dumps(content)).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serves timetabling jobs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="solver processes")
+    parser.add_argument("--max-jobs", type=int, default=32, help="unfinished jobs accepted at once")
+    args = parser.parse_args()
+    service = SchedulingService(args.workers, args.max_jobs)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+    asyncio.run(service.serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import csv
+import os
+import random
+from models import Group, Subject, Lecturer, Room
+from typing import List, Tuple, Optional
+from encoding import SESSION_TYPES
+
+def generate_instance(
+    groups: int = 4,
+    subjects: int = 14,
+    lecturers: int = 20,
+    rooms: int = 5,
+    subjects_per_group: int = 5,
+    qualification_density: float = 0.1,
+    room_tightness: float = 0.5,
+    seed: Optional[int] = None
+) -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]:
+    """
+    Generates a random instance of the given size, in the same form load_data returns.
+    Every lecturer is qualified for each (subject, session type) pair with probability
+    qualification_density, and every pair a group needs gets at least one qualified lecturer.
+    room_tightness between 0 and 1 controls the room capacities: at 0 every room seats the
+    largest group, at 1 capacities range from half to 1.2 times the largest group size, so small
+    rooms only fit some groups. One room always seats the largest group.
+    The same seed gives the same instance; the global random state is not touched.
+    """
+    rng = random.Random(seed)
+
+    subject_list: List[Subject] = []
+    for i in range(subjects):
+        subject_list.append(Subject(
+            name=f"Subject {i + 1}",
+            lecture_hours=rng.choice((30, 60)),
+            practice_hours=rng.choice((0, 30, 60))
+        ))
+
+    group_list: List[Group] = []
+    for i in range(groups):
+        chosen = rng.sample(subject_list, min(subjects_per_group, subjects))
+        group_list.append(Group(
+            group_id=f"G-{i + 1}",
+            size=rng.randint(15, 35),
+            subjects=[subject.name for subject in chosen]
+        ))
+
+    lecturer_list = [Lecturer(lecturer_id=f"L{i + 1}", name=f"Lecturer {i + 1}") for i in range(lecturers)]
+    needed = {
+        (subject.name, session_type)
+        for subject in subject_list
+        for session_type, hours in zip(SESSION_TYPES, (subject.lecture_hours, subject.practice_hours))
+        if hours > 0
+    }
+    for subject_name, session_type in sorted(needed):
+        qualified = [lecturer for lecturer in lecturer_list if rng.random() < qualification_density]
+        if not qualified and lecturer_list:
+            qualified = [rng.choice(lecturer_list)]
+        for lecturer in qualified:
+            lecturer.subjects.setdefault(subject_name, []).append(session_type)
+
+    largest = max((group.size for group in group_list), default=0)
+    room_list: List[Room] = []
+    for i in range(rooms):
+        if i == 0:
+            capacity = largest
+        else:
+            capacity = round(largest * rng.uniform(1 - room_tightness / 2, 1.2))
+        room_list.append(Room(room_id=f"R{i + 1}", capacity=capacity))
+
+    return group_list, subject_list, lecturer_list, room_list
+
+def write_instance(
+    instance: Tuple[List[Group], List[Subject], List[Lecturer], List[Room]],
+    data_dir: str
+) -> None:
+    """
+    Writes an instance as groups.csv, subjects.csv, lecturers.csv and rooms.csv in data_dir,
+    in the layout load_data reads.
+    """
+    groups, subjects, lecturers, rooms = instance
+    os.makedirs(data_dir, exist_ok=True)
+
+    with open(os.path.join(data_dir, "subjects.csv"), mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["subject_id", "name", "lecture_hours", "practice_hours"])
+        for i, subject in enumerate(subjects):
+            writer.writerow([f"S{i + 1}", subject.name, subject.lecture_hours, subject.practice_hours])
+
+    with open(os.path.join(data_dir, "groups.csv"), mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["group_id", "size", "subjects"])
+        for group in groups:
+            writer.writerow([group.group_id, group.size, ",".join(group.subjects)])
+
+    with open(os.path.join(data_dir, "lecturers.csv"), mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["lecturer_id", "name", "subject", "available_type"])
+        for lecturer in lecturers:
+            for subject_name, session_types in lecturer.subjects.items():
+                for session_type in session_types:
+                    writer.writerow([lecturer.lecturer_id, lecturer.name, subject_name, session_type])
+
+    with open(os.path.join(data_dir, "rooms.csv"), mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["room_id", "capacity"])
+        for room in rooms:
+            writer.writerow([room.room_id, room.capacity])
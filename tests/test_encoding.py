@@ -0,0 +1,79 @@
+import random
+import warnings
+from synthetic import generate_instance
+from genetic_algorithm import GeneticAlgorithm
+
+def make_ga(**options):
+    random.seed(0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ga = GeneticAlgorithm(*generate_instance(groups=8, subjects=12, lecturers=15, rooms=6, seed=3), **options)
+    ga.create_population()
+    return ga
+
+def contents(timetable):
+    return dict(timetable.schedule.items())
+
+def test_decode_round_trip():
+    ga = make_ga(population_size=5)
+    for timetable in ga.population:
+        decoded = ga.encoder.decode(ga.encoder.encode(timetable))
+        assert contents(decoded) == contents(timetable)
+        assert decoded.fingerprint() == timetable.fingerprint()
+        assert decoded.conflicts == timetable.conflicts
+
+def test_packed_timetable_decodes_on_use():
+    ga = make_ga(population_size=5)
+    timetable = ga.population[0]
+    expected = contents(timetable)
+    fingerprint, conflicts, size = timetable.fingerprint(), timetable.conflicts, len(timetable.schedule)
+    timetable.pack(ga.encoder)
+    assert timetable.packed
+    assert (timetable.fingerprint(), timetable.conflicts) == (fingerprint, conflicts)
+    assert ga.encoder.lessons(ga.encoder.encode(timetable)) == expected
+    assert timetable.packed
+    assert len(timetable.schedule) == size
+    assert timetable.packed
+    assert contents(timetable) == expected
+    assert not timetable.packed
+    key = next(iter(expected))
+    del timetable.schedule[key]
+    assert timetable.encoding(ga.encoder) is None
+    timetable.pack(ga.encoder)
+    assert key not in contents(timetable)
+
+def test_crossover_on_packed_parents_matches_unpacked():
+    ga = make_ga(population_size=10)
+    pairs = [random.sample(ga.population, 2) for _ in range(20)]
+    state = random.getstate()
+    expected = [contents(ga.crossover_days(first, second)) for first, second in pairs]
+    for timetable in ga.population:
+        timetable.pack(ga.encoder)
+    random.setstate(state)
+    for (first, second), schedule in zip(pairs, expected):
+        child = ga.crossover_days(first, second)
+        assert contents(child) == schedule
+        assert ga.encoder.lessons(child.encoding(ga.encoder)) == schedule
+        assert first.packed and second.packed
+
+def test_mutated_child_of_packed_parent_keeps_its_encoding():
+    ga = make_ga(population_size=10)
+    for timetable in ga.population:
+        timetable.pack(ga.encoder)
+    checked = 0
+    for _ in range(100):
+        parent = random.choice(ga.population)
+        child = ga.apply_operator(random.choice(list(ga.operators)), parent)
+        if child is None:
+            continue
+        kept = child.encoding(ga.encoder)
+        assert kept is not None
+        assert ga.encoder.lessons(kept) == contents(child)
+        checked += 1
+    assert checked > 0
+
+def test_packed_run_scores_match_full_rescoring():
+    ga = make_ga(population_size=20, generations=10, pack_population=True)
+    ga.run()
+    assert all(timetable.packed for timetable in ga.population)
+    assert ga.fitness_scores == [ga.calculate_individual_fitness(timetable) for timetable in ga.population]
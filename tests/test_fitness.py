@@ -0,0 +1,103 @@
+import os
+import random
+import warnings
+import pytest
+from models import Timetable
+from utils import load_data
+from synthetic import generate_instance
+from timegrid import TimeGrid
+from genetic_algorithm import GeneticAlgorithm
+from fitness import BatchFitnessEvaluator
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+def make_ga(instance, grid=None, seed=0, population_size=20):
+    random.seed(seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ga = GeneticAlgorithm(*instance, population_size=population_size, grid=grid)
+    ga.create_population()
+    return ga
+
+def clashing_child(ga):
+    """
+    Returns a timetable with a lecturer double-booked, made from a member of the population.
+    """
+    timetable = ga.population[0].copy()
+    lessons = list(timetable.schedule.items())
+    for (group_id, slot), (_, lecturer, _, _) in lessons:
+        for (other_id, other_slot), (subject, other_lecturer, room, session_type) in lessons:
+            if other_slot == slot and other_id != group_id and other_lecturer is not lecturer:
+                timetable.schedule[(other_id, slot)] = (subject, lecturer, room, session_type)
+                assert timetable.conflicts > 0
+                return timetable
+    raise AssertionError("no two groups have lessons in the same slot")
+
+def population_under_test(ga):
+    """
+    The population, unvalidated crossover children, a clashing timetable and an empty one.
+    """
+    children = [ga.crossover_days(*random.sample(ga.population, 2)) for _ in range(10)]
+    return ga.population + children + [clashing_child(ga), Timetable()]
+
+def reference_windows(slots):
+    days = {}
+    for day, period in slots:
+        days.setdefault(day, []).append(period)
+    windows = 0
+    for periods in days.values():
+        periods.sort()
+        windows += sum(b - a - 1 for a, b in zip(periods, periods[1:]))
+    return windows
+
+@pytest.fixture(scope="module")
+def sample_instance():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return load_data(DATA_DIR, use_cache=False)
+
+@pytest.mark.parametrize("grid", [TimeGrid(), TimeGrid(5, 8), TimeGrid(5, 4, 2), TimeGrid(6, 8, 2)])
+def test_count_windows_matches_sorted_gaps(grid):
+    rng = random.Random(1)
+    for _ in range(500):
+        slots = rng.sample(grid.slots, rng.randint(0, len(grid.slots)))
+        assert grid.count_windows(slots) == reference_windows(slots)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_matches_individual_fitness(sample_instance, seed):
+    ga = make_ga(sample_instance, seed=seed)
+    timetables = population_under_test(ga)
+    expected = [ga.calculate_individual_fitness(timetable) for timetable in timetables]
+    assert BatchFitnessEvaluator(ga.encoder).evaluate_timetables(timetables) == expected
+    assert ga.evaluate(timetables) == expected
+
+@pytest.mark.parametrize("chunk_size", [1, 7])
+def test_batch_scores_in_chunks(sample_instance, chunk_size):
+    ga = make_ga(sample_instance)
+    timetables = population_under_test(ga)
+    expected = [ga.calculate_individual_fitness(timetable) for timetable in timetables]
+    evaluator = BatchFitnessEvaluator(ga.encoder, chunk_size=chunk_size)
+    assert evaluator.evaluate_timetables(timetables) == expected
+    assert evaluator.evaluate(ga.encoder.encode_population(timetables)).tolist() == expected
+    assert evaluator.evaluate_timetables([]) == []
+
+@pytest.mark.parametrize("grid", [TimeGrid(5, 8), TimeGrid(5, 4, 2)])
+def test_batch_matches_individual_fitness_on_other_grids(grid):
+    ga = make_ga(generate_instance(groups=8, subjects=12, lecturers=15, rooms=6, seed=3), grid=grid)
+    timetables = population_under_test(ga)
+    expected = [ga.calculate_individual_fitness(timetable) for timetable in timetables]
+    assert BatchFitnessEvaluator(ga.encoder).evaluate_timetables(timetables) == expected
+
+@pytest.mark.parametrize("grid", [TimeGrid(), TimeGrid(6, 8, 2)])
+def test_delta_fitness_matches_full_rescoring(sample_instance, grid):
+    ga = make_ga(sample_instance, grid=grid)
+    checked = 0
+    for _ in range(300):
+        parent = random.choice(ga.population)
+        result = ga.operators[random.choice(list(ga.operators))](parent)
+        if result is None:
+            continue
+        child, changes = result
+        assert ga.score_change(parent, child, changes) == ga.calculate_individual_fitness(child)
+        checked += 1
+    assert checked > 0
@@ -0,0 +1,116 @@
+import random
+from collections import Counter
+import pytest
+from models import Timetable, Subject, Lecturer, Room
+
+SLOTS = [(day, period) for day in range(2) for period in range(3)]
+GROUPS = ["G1", "G2", "G3"]
+SUBJECTS = [Subject("S1", 30, 30), Subject("S2", 60, 0)]
+# Two lecturers share a name, so they clash with each other as calculate_individual_fitness counts them.
+LECTURERS = [Lecturer("L1", "Ann"), Lecturer("L2", "Bob"), Lecturer("L3", "Bob")]
+ROOMS = [Room("R1", 30), Room("R2", 40)]
+KEYS = [(group_id, slot) for group_id in GROUPS for slot in SLOTS]
+
+def random_assignment(rng):
+    return (rng.choice(SUBJECTS), rng.choice(LECTURERS), rng.choice(ROOMS), rng.choice(["Lecture", "Practice"]))
+
+def expected_counts(model):
+    lecturers = Counter((lecturer.name, slot) for (_, slot), (_, lecturer, _, _) in model.items())
+    rooms = Counter((room.room_id, slot) for (_, slot), (_, _, room, _) in model.items())
+    return lecturers, rooms
+
+def flat_timetable(model):
+    timetable = Timetable()
+    for key, assignment in model.items():
+        timetable.schedule[key] = assignment
+    return timetable
+
+def check(timetable, model):
+    """
+    Compares the timetable with its dict model through lookups only, which leave overlays in place.
+    """
+    depth = timetable.depth
+    assert len(timetable.schedule) == len(model)
+    for key in KEYS:
+        assert timetable.schedule.get(key) is model.get(key)
+        assert (key in timetable.schedule) == (key in model)
+    lecturers, rooms = expected_counts(model)
+    for slot in SLOTS:
+        for name in ("Ann", "Bob"):
+            assert timetable.lecturer_slots.get((name, slot), 0) == lecturers[(name, slot)]
+            assert ((name, slot) in timetable.lecturer_slots) == ((name, slot) in lecturers)
+        for room in ROOMS:
+            assert timetable.room_slots.get((room.room_id, slot), 0) == rooms[(room.room_id, slot)]
+            assert ((room.room_id, slot) in timetable.room_slots) == ((room.room_id, slot) in rooms)
+    assert timetable.conflicts == sum(count - 1 for count in lecturers.values()) + sum(count - 1 for count in rooms.values())
+    assert timetable.fingerprint() == flat_timetable(model).fingerprint()
+    assert timetable.depth == depth <= Timetable.max_depth
+
+def check_full_read(timetable, model):
+    assert dict(timetable.schedule.items()) == model
+    lecturers, rooms = expected_counts(model)
+    assert dict(timetable.lecturer_slots.items()) == dict(lecturers)
+    assert dict(timetable.room_slots.items()) == dict(rooms)
+    assert timetable.depth == 0
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_operations_match_dict_model(seed, monkeypatch):
+    monkeypatch.setattr(Timetable, "max_depth", 3)
+    rng = random.Random(seed)
+    timetables = [(Timetable(), {})]
+    for _ in range(300):
+        index = rng.randrange(len(timetables))
+        timetable, model = timetables[index]
+        operation = rng.choice(["set", "set", "set", "pop", "pop", "derive", "derive", "copy", "compact", "read", "random_key"])
+        if operation == "set":
+            key = rng.choice(KEYS)
+            model[key] = timetable.schedule[key] = random_assignment(rng)
+        elif operation == "pop" and model:
+            key = rng.choice(sorted(model))
+            assert timetable.schedule.pop(key) is model.pop(key)
+        elif operation == "derive":
+            timetables.append((timetable.derive(), dict(model)))
+        elif operation == "copy":
+            timetables.append((timetable.copy(), dict(model)))
+        elif operation == "compact":
+            timetable.compact()
+        elif operation == "read":
+            check_full_read(timetable, model)
+        elif operation == "random_key" and model:
+            depth = timetable.depth
+            assert timetable.schedule.random_key() in model
+            assert timetable.depth == depth
+        # The timetable operated on, the newest one and a random other, which must not see the change.
+        for other, other_model in {index: timetables[index], -1: timetables[-1], 0: rng.choice(timetables)}.values():
+            check(other, other_model)
+    for timetable, model in timetables:
+        check(timetable, model)
+        check_full_read(timetable, model)
+
+def test_random_key_is_uniform_over_an_overlay():
+    rng = random.Random(1)
+    parent = Timetable()
+    for key in KEYS[:12]:
+        parent.schedule[key] = random_assignment(rng)
+    child = parent.derive()
+    del child.schedule[KEYS[0]]
+    child.schedule[KEYS[1]] = random_assignment(rng)
+    child.schedule[KEYS[15]] = random_assignment(rng)
+    expected = set(KEYS[1:12]) | {KEYS[15]}
+    random.seed(2)
+    draws = Counter(child.schedule.random_key() for _ in range(6000))
+    assert set(draws) == expected
+    assert max(draws.values()) < 1.3 * min(draws.values())
+    assert child.depth == 1
+
+def test_random_key_of_a_flat_timetable_matches_random_choice():
+    rng = random.Random(3)
+    timetable = flat_timetable({key: random_assignment(rng) for key in KEYS[:10]})
+    random.seed(4)
+    expected = [random.choice(list(timetable.schedule.keys())) for _ in range(20)]
+    random.seed(4)
+    assert [timetable.schedule.random_key() for _ in range(20)] == expected
+
+def test_random_key_of_an_empty_schedule_raises():
+    with pytest.raises(IndexError):
+        Timetable().derive().schedule.random_key()
@@ -0,0 +1,27 @@
+import random
+import warnings
+from synthetic import generate_instance
+from genetic_algorithm import GeneticAlgorithm
+
+def build_population(workers, seeding):
+    random.seed(5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ga = GeneticAlgorithm(
+            *generate_instance(groups=6, subjects=10, lecturers=12, rooms=5, seed=1),
+            population_size=6, workers=workers, seeding=seeding
+        )
+    try:
+        ga.create_population()
+    finally:
+        ga.close()
+    lessons = [
+        [(key, subject.name, lecturer.lecturer_id, room.room_id, session_type)
+         for key, (subject, lecturer, room, session_type) in timetable.schedule.items()]
+        for timetable in ga.population
+    ]
+    return lessons, ga.fitness_scores, random.random()
+
+def test_population_does_not_depend_on_worker_count():
+    for seeding in ('random', 'mixed'):
+        assert build_population(1, seeding) == build_population(2, seeding)
@@ -0,0 +1,34 @@
+import pytest
+from service import options_from_payload
+
+def test_options_split_into_algorithm_and_run_arguments():
+    options = {"population_size": 20, "seeding": "mixed", "mutation_count": None, "time_budget": 1.5, "seed": 3}
+    assert options_from_payload({"options": options}) == (
+        {"population_size": 20, "seeding": "mixed", "mutation_count": None},
+        {"time_budget": 1.5},
+    )
+    assert options_from_payload({}) == ({}, {})
+
+@pytest.mark.parametrize("options", [
+    {"seeding": "bogus"},
+    {"selection": "roulette"},
+    {"population_size": "many"},
+    {"population_size": 0},
+    {"population_size": 2.5},
+    {"generations": -1},
+    {"generations": None},
+    {"elite_count": True},
+    {"mutation_rate": 1.5},
+    {"pack_population": "yes"},
+    {"time_budget": float("nan")},
+    {"target_fitness": float("inf")},
+    {"seed": [1]},
+    {"populaton_size": 20},
+])
+def test_invalid_options_are_refused(options):
+    with pytest.raises(ValueError):
+        options_from_payload({"options": options})
+
+def test_options_must_be_an_object():
+    with pytest.raises(ValueError):
+        options_from_payload({"options": [1]})
@@ -0,0 +1,63 @@
+import os
+import warnings
+import pytest
+from synthetic import generate_instance, write_instance
+from utils import CACHE_FILE, load_data, validate_instance
+
+def describe(instance):
+    return [[vars(item) for item in part] for part in instance]
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_instance(generate_instance(groups=6, subjects=8, lecturers=10, rooms=4, seed=2), str(tmp_path))
+    return str(tmp_path)
+
+def load(data_dir, **options):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return load_data(data_dir, **options)
+
+def test_cached_load_matches_parsed_csvs(data_dir):
+    expected = describe(load(data_dir, use_cache=False))
+    assert describe(load(data_dir)) == expected
+    assert os.path.exists(os.path.join(data_dir, CACHE_FILE))
+    assert describe(load(data_dir)) == expected
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"\xff\xfe not json",
+    b'{"format": 2, "digest": ',
+    b"[1, 2]",
+    b'{"format": 2}',
+])
+def test_corrupt_cache_falls_back_to_csvs(data_dir, content):
+    expected = describe(load(data_dir, use_cache=False))
+    with open(os.path.join(data_dir, CACHE_FILE), mode="wb") as file:
+        file.write(content)
+    assert describe(load(data_dir)) == expected
+
+def test_malformed_tables_fall_back_to_csvs(data_dir):
+    expected = describe(load(data_dir))
+    path = os.path.join(data_dir, CACHE_FILE)
+    with open(path) as file:
+        content = file.read()
+    start = content.index('"tables":') + len('"tables":')
+    for tables in ('[[["S", 1]], [], [], []]', '[[], [["G", 1, [9]]], [], []]', '[[], [], [["L", "n", [0], [[7]]]], []]', '[[], []]'):
+        with open(path, mode="w") as file:
+            file.write(content[:start] + tables + "}")
+        assert describe(load(data_dir)) == expected
+
+@pytest.mark.parametrize("lecture_hours, practice_hours, valid", [
+    (0, 0, True), (30, 0, True), (5, 0, True), (0, 5, True),
+    (4, 0, False), (1, 30, False), (30, 3, False), (-5, 30, False),
+])
+def test_validate_instance_subject_hours(lecture_hours, practice_hours, valid):
+    instance = generate_instance(groups=4, subjects=5, lecturers=8, rooms=3, seed=1)
+    instance[1][0].lecture_hours, instance[1][0].practice_hours = lecture_hours, practice_hours
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if valid:
+            validate_instance(*instance)
+        else:
+            with pytest.raises(ValueError):
+                validate_instance(*instance)
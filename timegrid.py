@@ -0,0 +1,67 @@
+from typing import List, Dict, Tuple, Iterable
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def window_table(periods: int) -> List[int]:
+    """
+    Returns a lookup table indexed by a day's occupancy bitmask (bit p set when period p holds a lesson)
+    that gives the number of free periods between the first and last lesson of the day.
+    """
+    table = [0] * (1 << periods)
+    for mask in range(1, 1 << periods):
+        first = (mask & -mask).bit_length()
+        table[mask] = mask.bit_length() - first + 1 - bin(mask).count("1")
+    return table
+
+class TimeGrid:
+    """
+    The teaching slots of a timetable: weeks rotating weeks of days teaching days with periods periods each.
+    Slots are (day, period) pairs, with days numbered across the whole rotation, so day d falls on
+    weekday d % days of week d // days. Windows are counted per day on period bitmasks with a lookup table.
+    """
+    MAX_PERIODS = 16
+
+    def __init__(self, days: int = 5, periods: int = 4, weeks: int = 1):
+        if min(days, periods, weeks) < 1:
+            raise ValueError(f"Time grid dimensions must be positive, got days={days}, periods={periods}, weeks={weeks}")
+        if periods > self.MAX_PERIODS:
+            raise ValueError(f"At most {self.MAX_PERIODS} periods per day are supported, got {periods}")
+        self.days = days
+        self.periods = periods
+        self.weeks = weeks
+        self.slots: List[Tuple[int, int]] = [(day, period) for day in range(days * weeks) for period in range(periods)]
+        self.window_table = window_table(periods)
+
+    @property
+    def n_days(self) -> int:
+        return self.days * self.weeks
+
+    def day_label(self, day: int) -> str:
+        weekday = day % self.days
+        name = WEEKDAY_NAMES[weekday] if self.days <= len(WEEKDAY_NAMES) else f"Day {weekday + 1}"
+        return f"Week {day // self.days + 1} {name}" if self.weeks > 1 else name
+
+    def day_masks(self, slots: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Returns the occupancy bitmask of every day that has at least one of the given slots.
+        """
+        masks: Dict[int, int] = {}
+        for day, period in slots:
+            masks[day] = masks.get(day, 0) | (1 << period)
+        return masks
+
+    def count_windows(self, slots: Iterable[Tuple[int, int]]) -> int:
+        """
+        Returns the number of free periods between the first and last lesson of each day, summed over days.
+        """
+        table = self.window_table
+        return sum(table[mask] for mask in self.day_masks(slots).values())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TimeGrid) and (self.days, self.periods, self.weeks) == (other.days, other.periods, other.weeks)
+
+    def __hash__(self) -> int:
+        return hash((self.days, self.periods, self.weeks))
+
+    def __repr__(self) -> str:
+        return f"TimeGrid(days={self.days}, periods={self.periods}, weeks={self.weeks})"
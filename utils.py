@@ -1,22 +1,210 @@
 import csv
+import hashlib
+import json
 import os
 import random
+import re
+import warnings
 from models import Timetable, Group, Subject, Lecturer, Room
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Set, TextIO
+from encoding import SESSION_TYPES
+from timegrid import TimeGrid
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
-TIME_SLOTS: List[Tuple[int, int]] = [(day, period) for day in range(5) for period in range(4)]
+TIME_SLOTS: List[Tuple[int, int]] = TimeGrid().slots
 DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 
-def load_data() -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]:
+DATA_FILES = ("subjects.csv", "groups.csv", "lecturers.csv", "rooms.csv")
+CACHE_FILE = ".instance_cache.json"
+CACHE_FORMAT = 2
+Instance = Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]
+
+def load_data(data_dir: str = "data", use_cache: bool = True) -> Instance:
+    """
+    Loads the instance from subjects.csv, groups.csv, lecturers.csv and rooms.csv in data_dir
+    and validates it with validate_instance.
+    With use_cache, the parsed instance is also stored in data_dir as compact JSON tables keyed by
+    a hash of the four files, and later loads of unchanged files read it instead of the CSVs.
+    An unreadable or malformed cache file is ignored and the CSVs are parsed again.
+    """
+    if not use_cache:
+        instance = _parse_data(data_dir)
+        validate_instance(*instance)
+        return instance
+    digest = _data_digest(data_dir)
+    cache_path = os.path.join(data_dir, CACHE_FILE)
+    instance = _read_cache(cache_path, digest)
+    if instance is None:
+        instance = _parse_data(data_dir)
+        validate_instance(*instance)
+        _write_cache(cache_path, digest, instance)
+    else:
+        validate_instance(*instance)
+    return instance
+
+def load_grid(data_dir: str = "data") -> TimeGrid:
+    """
+    Reads the time grid from grid.csv in data_dir (columns days, periods, weeks; one row).
+    Without that file the default grid of 5 days with 4 periods is used.
+    """
+    path = os.path.join(data_dir, "grid.csv")
+    if not os.path.exists(path):
+        return TimeGrid()
+    with open(path, mode="r") as file:
+        row = next(csv.DictReader(file), None)
+    if row is None:
+        raise ValueError(f"{path} has no grid row")
+    return TimeGrid(int(row["days"]), int(row["periods"]), int(row.get("weeks") or 1))
+
+def validate_instance(
+    groups: List[Group],
+    subjects: List[Subject],
+    lecturers: List[Lecturer],
+    rooms: List[Room]
+) -> None:
+    """
+    Raises ValueError if there are no groups, subjects, lecturers or rooms, a group size or room capacity
+    is not positive, a subject has negative hours or 1 to 4 lecture or practice hours (too few for one
+    5-hour session, which generate_valid_schedule cannot place), a group or lecturer refers to a subject
+    missing from subjects.csv or a lecturer lists a session type other than Lecture or Practice,
+    and warns about session types with hours that no lecturer is qualified to teach.
+    """
+    missing = [
+        name for name, items in (("groups", groups), ("subjects", subjects), ("lecturers", lecturers), ("rooms", rooms))
+        if not items
+    ]
+    if missing:
+        raise ValueError("The instance has no " + ", ".join(missing))
+    non_positive = [
+        f"group {group.group_id}: size {group.size}" for group in groups if group.size <= 0
+    ] + [
+        f"room {room.room_id}: capacity {room.capacity}" for room in rooms if room.capacity <= 0
+    ] + [
+        f"subject {subject.name}: {subject.lecture_hours} lecture, {subject.practice_hours} practice hours"
+        for subject in subjects
+        if any(hours < 0 or 0 < hours < 5 for hours in (subject.lecture_hours, subject.practice_hours))
+    ]
+    if non_positive:
+        raise ValueError("Non-positive sizes or invalid hours (negative or 1-4) for " + ", ".join(non_positive))
+    subject_names = set(subject.name for subject in subjects)
+    unknown = [
+        f"group {group.group_id}: {name}" for group in groups for name in group.subjects if name not in subject_names
+    ] + [
+        f"lecturer {lecturer.lecturer_id}: {name}" for lecturer in lecturers for name in lecturer.subjects
+        if name not in subject_names
+    ]
+    if unknown:
+        raise ValueError("Unknown subjects referenced by " + ", ".join(unknown))
+    unknown_types = sorted(set(
+        f"lecturer {lecturer.lecturer_id}: {session_type}"
+        for lecturer in lecturers
+        for session_types in lecturer.subjects.values()
+        for session_type in session_types
+        if session_type not in SESSION_TYPES
+    ))
+    if unknown_types:
+        raise ValueError("Unknown session types " + ", ".join(unknown_types))
+
+    taught = set(
+        (subject_name, session_type)
+        for lecturer in lecturers
+        for subject_name, session_types in lecturer.subjects.items()
+        for session_type in session_types
+    )
+    untaught = [
+        f"{subject.name} / {session_type}"
+        for subject in subjects
+        for session_type, hours in zip(SESSION_TYPES, (subject.lecture_hours, subject.practice_hours))
+        if hours > 0 and (subject.name, session_type) not in taught
+    ]
+    if untaught:
+        warnings.warn("No qualified lecturer for: " + ", ".join(untaught))
+
+def _data_digest(data_dir: str) -> str:
+    digest = hashlib.sha256()
+    for name in DATA_FILES:
+        with open(os.path.join(data_dir, name), mode="rb") as file:
+            digest.update(name.encode())
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def _read_cache(path: str, digest: str) -> Optional[Instance]:
+    # JSON rather than pickle, so a planted cache file can at worst fail to parse.
+    try:
+        with open(path, mode="rb") as file:
+            cached = json.loads(file.read())
+        if not isinstance(cached, dict) or cached.get("format") != CACHE_FORMAT or cached.get("digest") != digest:
+            return None
+        return _instance_from_tables(cached["tables"])
+    except (OSError, KeyError, IndexError, TypeError, ValueError, RecursionError):
+        return None
+
+def _write_cache(path: str, digest: str, instance: Instance) -> None:
+    # A data directory we cannot write to just means no cache.
+    try:
+        with open(path, mode="w") as file:
+            json.dump(
+                {"format": CACHE_FORMAT, "digest": digest, "tables": _instance_to_tables(*instance)},
+                file, separators=(",", ":")
+            )
+    except OSError:
+        pass
+
+def _instance_to_tables(
+    groups: List[Group],
+    subjects: List[Subject],
+    lecturers: List[Lecturer],
+    rooms: List[Room]
+) -> Tuple:
+    """
+    Flattens an instance into tuples of plain values, with subjects referred to by their index
+    and session types by their index in SESSION_TYPES.
+    """
+    subject_ids = {subject.name: i for i, subject in enumerate(subjects)}
+    return (
+        tuple((subject.name, subject.lecture_hours, subject.practice_hours) for subject in subjects),
+        tuple((group.group_id, group.size, tuple(subject_ids[name] for name in group.subjects)) for group in groups),
+        tuple(
+            (
+                lecturer.lecturer_id,
+                lecturer.name,
+                tuple(subject_ids[name] for name in lecturer.subjects),
+                tuple(_session_codes(session_types) for session_types in lecturer.subjects.values()),
+            )
+            for lecturer in lecturers
+        ),
+        tuple((room.room_id, room.capacity) for room in rooms),
+    )
+
+def _session_codes(session_types: List[str]) -> Tuple[int, ...]:
+    return tuple(SESSION_TYPES.index(session_type) for session_type in session_types)
+
+def _instance_from_tables(tables: Tuple) -> Instance:
+    subject_rows, group_rows, lecturer_rows, room_rows = tables
+    subjects = [Subject(str(name), int(lecture_hours), int(practice_hours)) for name, lecture_hours, practice_hours in subject_rows]
+    names = [subject.name for subject in subjects]
+    groups = [Group(str(group_id), int(size), [names[i] for i in subject_ids]) for group_id, size, subject_ids in group_rows]
+    session_lists: Dict[Tuple[int, ...], List[str]] = {}
+    lecturers = []
+    for lecturer_id, name, subject_ids, codes_per_subject in lecturer_rows:
+        lecturer = Lecturer(str(lecturer_id), str(name))
+        for subject_id, codes in zip(subject_ids, codes_per_subject):
+            codes = tuple(codes)
+            session_types = session_lists.get(codes)
+            if session_types is None:
+                session_types = session_lists[codes] = [SESSION_TYPES[i] for i in codes]
+            lecturer.subjects[names[subject_id]] = session_types.copy()
+        lecturers.append(lecturer)
+    rooms = [Room(str(room_id), int(capacity)) for room_id, capacity in room_rows]
+    return groups, subjects, lecturers, rooms
+
+def _parse_data(data_dir: str) -> Instance:
     groups: List[Group] = []
     subjects: Dict[str, Subject] = {}
     lecturers_dict: Dict[str, Lecturer] = {}
-    lecturers: List[Lecturer] = []
     rooms: List[Room] = []
 
-    with open("data/subjects.csv", mode="r") as file:
+    with open(os.path.join(data_dir, "subjects.csv"), mode="r") as file:
         reader = csv.DictReader(file)
         for row in reader:
             subject = Subject(
@@ -26,7 +214,7 @@ def load_data() -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]
             )
             subjects[subject.name] = subject
 
-    with open("data/groups.csv", mode="r") as file:
+    with open(os.path.join(data_dir, "groups.csv"), mode="r") as file:
         reader = csv.DictReader(file)
         for row in reader:
             subjects_list = [s.strip() for s in row["subjects"].split(",")]
@@ -37,27 +225,19 @@ def load_data() -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]
             )
             groups.append(group)
 
-    with open("data/lecturers.csv", mode="r") as file:
+    with open(os.path.join(data_dir, "lecturers.csv"), mode="r") as file:
         reader = csv.DictReader(file)
         for row in reader:
             lecturer_id = row["lecturer_id"]
-            name = row["name"]
             subject_name = row["subject"].strip()
             available_type = row["available_type"].strip()
 
-            if lecturer_id not in lecturers_dict:
-                lecturer = Lecturer(lecturer_id=lecturer_id, name=name)
-                lecturers_dict[lecturer_id] = lecturer
-            else:
-                lecturer = lecturers_dict[lecturer_id]
-
-            if subject_name not in lecturer.subjects:
-                lecturer.subjects[subject_name] = []
-            lecturer.subjects[subject_name].append(available_type)
-
-    lecturers = list(lecturers_dict.values())
+            lecturer = lecturers_dict.get(lecturer_id)
+            if lecturer is None:
+                lecturer = lecturers_dict[lecturer_id] = Lecturer(lecturer_id=lecturer_id, name=row["name"])
+            lecturer.subjects.setdefault(subject_name, []).append(available_type)
 
-    with open("data/rooms.csv", mode="r") as file:
+    with open(os.path.join(data_dir, "rooms.csv"), mode="r") as file:
         reader = csv.DictReader(file)
         for row in reader:
             room = Room(
@@ -66,70 +246,133 @@ def load_data() -> Tuple[List[Group], List[Subject], List[Lecturer], List[Room]]
             )
             rooms.append(room)
 
-    return groups, list(subjects.values()), lecturers, rooms
+    return groups, list(subjects.values()), list(lecturers_dict.values()), rooms
 
 def check_constraints(timetable: Timetable, groups: List[Group]) -> int:
-    violations = 0
-    lecturer_schedule: Dict[Tuple[str, Tuple[int, int]], bool] = {}
-    room_schedule: Dict[Tuple[str, Tuple[int, int]], bool] = {}
-    group_schedule: Dict[Tuple[str, Tuple[int, int]], bool] = {}
+    """
+    Returns the number of hard-constraint clashes: lessons that share a slot with an earlier lesson
+    of the same lecturer or in the same room (a group holds at most one lesson per slot by construction).
+    The timetable keeps this count in its occupancy index, so the check is O(1).
+    """
+    return timetable.conflicts
 
-    for (group_id, slot), (subject, lecturer, room, session_type) in timetable.schedule.items():
-        if group_schedule.get((group_id, slot)):
-            violations += 1 
-        else:
-            group_schedule[(group_id, slot)] = True
-
-        if lecturer_schedule.get((lecturer.name, slot)):
-            violations += 1
-        else:
-            lecturer_schedule[(lecturer.name, slot)] = True
+CSV_HEADER = ["Group ID", "Day", "Period", "Subject", "Lecturer", "Room ID", "Session Type"]
+VIEWS = ('group', 'lecturer', 'room')
 
-        if room_schedule.get((room.room_id, slot)):
-            violations += 1
-        else:
-            room_schedule[(room.room_id, slot)] = True
+def iter_schedule_rows(timetable: Timetable) -> Iterator[List]:
+    """
+    Yields the CSV rows of the timetable, header first, one lesson per row.
+    """
+    yield CSV_HEADER
+    for (group_id, (day, period)), (subject, lecturer, room, session_type) in timetable.schedule.items():
+        yield [group_id, day, period, subject.name, lecturer.name, room.room_id, session_type]
 
-    return violations
+def write_schedule_csv(timetable: Timetable, stream: TextIO) -> None:
+    """
+    Writes the timetable as CSV to an open text stream, row by row, without building it in memory.
+    """
+    csv.writer(stream).writerows(iter_schedule_rows(timetable))
 
 def schedule_to_csv(timetable: Timetable, filename: str = "schedule.csv") -> None:
     with open(filename, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Group ID", "Day", "Period", "Subject", "Lecturer", "Room ID", "Session Type"])
-
-        for (group_id, (day, period)), (subject, lecturer, room, session_type) in timetable.schedule.items():
-            writer.writerow([group_id, day, period, subject.name, lecturer.name, room.room_id, session_type])
+        write_schedule_csv(timetable, file)
     print(f"Schedule saved to {filename}")
 
-def save_schedule_to_excel(timetable: Timetable, output_folder: str = "schedules") -> None:
-    import os
-    from openpyxl import Workbook
+ScheduleRow = Tuple[str, Tuple[int, int], str, str, str, str]
 
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+def read_schedule_csv(filename: str) -> List[ScheduleRow]:
+    """
+    Reads a file written by schedule_to_csv back as (group id, slot, subject name, lecturer name,
+    room id, session type) rows. Names are not resolved, since the instance may have changed since.
+    """
+    with open(filename, mode="r", newline="") as file:
+        return [
+            (row["Group ID"], (int(row["Day"]), int(row["Period"])), row["Subject"], row["Lecturer"],
+             row["Room ID"], row["Session Type"])
+            for row in csv.DictReader(file)
+        ]
+
+def schedule_views(timetable: Timetable, views: Iterable[str] = VIEWS) -> Dict[str, Dict[str, Dict[Tuple[int, int], str]]]:
+    """
+    Groups the lessons by group, lecturer and room in a single pass over the schedule.
+    Returns {view: {owner: {slot: cell text}}} for the requested views. A cell names the other
+    parties of the lesson; lessons that clash in a lecturer or room view share the cell, separated by " / ".
+    """
+    views = tuple(views)
+    unknown = [view for view in views if view not in VIEWS]
+    if unknown:
+        raise ValueError(f"Unknown views {unknown}, expected some of {VIEWS}")
+    grouped: Dict[str, Dict[str, Dict[Tuple[int, int], str]]] = {view: {} for view in views}
+    by_group, by_lecturer, by_room = (grouped.get(view) for view in VIEWS)
+    for (group_id, slot), (subject, lecturer, room, session_type) in timetable.schedule.items():
+        if by_group is not None:
+            by_group.setdefault(group_id, {})[slot] = f"{subject.name} : {lecturer.name} : {room.room_id} :: {session_type}"
+        if by_lecturer is not None:
+            _add_cell(by_lecturer.setdefault(lecturer.name, {}), slot, f"{subject.name} : {group_id} : {room.room_id} :: {session_type}")
+        if by_room is not None:
+            _add_cell(by_room.setdefault(room.room_id, {}), slot, f"{subject.name} : {group_id} : {lecturer.name} :: {session_type}")
+    return grouped
 
-    groups = set(group_id for (group_id, _) in timetable.schedule.keys())
+def _add_cell(cells: Dict[Tuple[int, int], str], slot: Tuple[int, int], text: str) -> None:
+    cells[slot] = f"{cells[slot]} / {text}" if slot in cells else text
 
-    for group_id in groups:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"Group {group_id}"
+def save_schedule_to_excel(
+    timetable: Timetable,
+    output_folder: str = "schedules",
+    views: Iterable[str] = ('group',),
+    single_workbook: bool = False,
+    grid: Optional[TimeGrid] = None
+) -> List[str]:
+    """
+    Saves a day-by-period sheet for every group, and for every lecturer and room if those views are
+    requested. With single_workbook all sheets go to schedule.xlsx, otherwise each sheet is saved
+    as its own file named <view>_<owner>.xlsx. Workbooks are written in openpyxl write-only mode
+    from one pass over the schedule. Sheets follow the given time grid, the default one if None.
+    Returns the paths of the written files.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    grid = grid if grid is not None else TimeGrid()
+    days = range(grid.n_days)
+    periods = range(grid.periods)
+    header = [None] + [grid.day_label(day) for day in days]
 
-        for col_num, day in enumerate(DAYS_OF_WEEK, start=2): 
-            col_letter = get_column_letter(col_num)
-            ws[f"{col_letter}1"] = day
+    def write_sheet(workbook: Workbook, title: str, cells: Dict[Tuple[int, int], str]) -> None:
+        sheet = workbook.create_sheet(title=title)
+        sheet.append(header)
+        for period in periods:
+            sheet.append([f"Period {period + 1}"] + [cells.get((day, period)) for day in days])
 
-        for row_num in range(2, 6): 
-            ws[f"A{row_num}"] = f"Period {row_num - 1}"
+    paths = []
+    grouped = schedule_views(timetable, views)
+    if single_workbook:
+        workbook = Workbook(write_only=True)
+        titles = set()
+        for view, owners in grouped.items():
+            for owner, cells in owners.items():
+                write_sheet(workbook, _sheet_title(f"{view.capitalize()} {owner}", titles), cells)
+        paths.append(os.path.join(output_folder, "schedule.xlsx"))
+        workbook.save(paths[-1])
+    else:
+        for view, owners in grouped.items():
+            for owner, cells in owners.items():
+                workbook = Workbook(write_only=True)
+                write_sheet(workbook, _sheet_title(f"{view.capitalize()} {owner}", set()), cells)
+                paths.append(os.path.join(output_folder, f"{view}_{_file_name(owner)}.xlsx"))
+                workbook.save(paths[-1])
+    print(f"Saved {sum(len(owners) for owners in grouped.values())} schedules to {len(paths)} file(s) in {output_folder}")
+    return paths
 
-        for (gid, (day, period)), (subject, lecturer, room, session_type) in timetable.schedule.items():
-            if gid == group_id:
-                col_num = day + 2 
-                row_num = period + 2 
-                col_letter = get_column_letter(col_num)
-                cell = f"{col_letter}{row_num}"
-                ws[cell] = f"{subject.name} : {lecturer.name} : {room.room_id} :: {session_type}"
+def _sheet_title(title: str, taken: Set[str]) -> str:
+    """
+    Makes a valid, unique Excel sheet title: at most 31 characters and none of []:*?/\\.
+    """
+    title = re.sub(r"[\[\]:*?/\\]", "_", title)[:31]
+    candidate, number = title, 2
+    while candidate.lower() in taken:
+        suffix = f" ({number})"
+        candidate, number = title[:31 - len(suffix)] + suffix, number + 1
+    taken.add(candidate.lower())
+    return candidate
 
-        filename = os.path.join(output_folder, f"group_{group_id}.xlsx")
-        wb.save(filename)
-        print(f"Schedule for Group {group_id} saved to {filename}")
\ No newline at end of file
+def _file_name(name: str) -> str:
+    return re.sub(r'[<>:"/\\|?*]', "_", name)